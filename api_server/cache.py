@@ -0,0 +1,131 @@
+import os
+import json
+import time
+import asyncio
+import logging
+from collections import OrderedDict
+
+from redis.asyncio import Redis
+
+from metrics import ADDRESS_CACHE_REQUESTS
+
+
+FIELDS = ("dt_created", "address", "order_id")
+
+
+async def invalidate(redis: Redis, channel: str, keys: list[str],
+                     sender: str = None):
+    await redis.pipeline(transaction=False) \
+        .delete(*keys) \
+        .publish(channel, json.dumps({"sender": sender, "keys": keys})) \
+        .execute()
+
+
+class AddressCache:
+    def __init__(self, redis: Redis, size: int, ttl: float,
+                 negative_ttl: float, redis_ttl: int, channel: str):
+        self.redis = redis
+        self.size = size
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.redis_ttl = redis_ttl
+        self.channel = channel
+        self.sender = os.urandom(8).hex()
+        self.local: OrderedDict[str, tuple[float, dict]] = OrderedDict()
+        self.task: asyncio.Task = None
+
+    def keys(self, row) -> list[str]:
+        return [f"address:{row['address']}", f"order:{row['order_id']}"]
+
+    def get_local(self, key: str) -> dict | None:
+        entry = self.local.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self.local[key]
+            return None
+        self.local.move_to_end(key)
+        return value
+
+    def set_local(self, key: str, value: dict):
+        ttl = self.ttl if value else min(self.ttl, self.negative_ttl)
+        self.local[key] = (time.monotonic() + ttl, value)
+        self.local.move_to_end(key)
+        while len(self.local) > self.size:
+            self.local.popitem(last=False)
+
+    async def get(self, key: str) -> dict | None:
+        value = self.get_local(key)
+        if value is not None:
+            ADDRESS_CACHE_REQUESTS.labels("local", "hit").inc()
+            return value
+        ADDRESS_CACHE_REQUESTS.labels("local", "miss").inc()
+
+        data = await self.redis.hgetall(key)
+        if not data:
+            ADDRESS_CACHE_REQUESTS.labels("redis", "miss").inc()
+            return None
+        ADDRESS_CACHE_REQUESTS.labels("redis", "hit").inc()
+
+        value = {
+            field.decode(): item.decode() for field, item in data.items()
+            if field != b"missing"
+        }
+        self.set_local(key, value)
+        return value
+
+    async def set(self, key: str, row):
+        if not row:
+            self.set_local(key, {})
+            await self.redis.pipeline(transaction=False) \
+                .hset(key, "missing", 1) \
+                .expire(key, int(self.negative_ttl) or 1) \
+                .execute()
+            return
+
+        await self.set_many([row])
+
+    async def set_many(self, rows: list):
+        pipe = self.redis.pipeline(transaction=False)
+        keys = []
+        for row in rows:
+            value = {field: str(row[field]) for field in FIELDS}
+            value["dt_created"] = row["dt_created"].isoformat()
+            for key in self.keys(row):
+                self.set_local(key, value)
+                pipe.delete(key)
+                pipe.hset(key, mapping=value)
+                pipe.expire(key, self.redis_ttl)
+                keys.append(key)
+        pipe.publish(self.channel,
+                     json.dumps({"sender": self.sender, "keys": keys}))
+        await pipe.execute()
+
+    async def listen(self):
+        while True:
+            try:
+                async with self.redis.pubsub() as pubsub:
+                    await pubsub.subscribe(self.channel)
+                    self.local.clear()
+                    async for message in pubsub.listen():
+                        if message["type"] != "message":
+                            continue
+                        data = json.loads(message["data"])
+                        if data["sender"] == self.sender:
+                            continue
+                        for key in data["keys"]:
+                            self.local.pop(key, None)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logging.exception("Address cache subscription failed")
+                await asyncio.sleep(1)
+
+    def start(self):
+        self.task = asyncio.create_task(self.listen())
+
+    async def stop(self):
+        if self.task:
+            self.task.cancel()
+            await asyncio.gather(self.task, return_exceptions=True)
@@ -4,6 +4,8 @@ import asyncpg
 from redis.asyncio import Redis
 
 from settings import settings
+from api_server.cache import AddressCache
+from api_server.rates import ExchangeRates
 
 
 class Database():
@@ -27,3 +29,12 @@ class Database():
 
 database = Database()
 cache = Redis(host=settings.REDIS_HOST)
+address_cache = AddressCache(
+    cache,
+    settings.ADDRESS_CACHE_SIZE,
+    settings.ADDRESS_CACHE_TTL,
+    settings.ADDRESS_CACHE_NEGATIVE_TTL,
+    settings.ADDRESS_CACHE_REDIS_TTL,
+    settings.ADDRESS_CACHE_CHANNEL
+)
+rates = ExchangeRates(settings.RATE_CHANNEL, settings.RATE_MAX_AGE)
@@ -1,15 +1,20 @@
-import asyncio
+from datetime import datetime
 from decimal import Decimal
-from typing import Any
+from typing import Any, Literal
 
-from fastapi import APIRouter, HTTPException
-from bitcoinaddress import Wallet
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.concurrency import run_in_threadpool
 from asyncpg.exceptions import UniqueViolationError
 
+import watch_set
 from settings import settings
 from database.sql import Queries
-from api_server.deps import database, cache
+from api_server.deps import database, cache, address_cache, rates
 from api_server import schemas
+from api_server.pagination import encode_cursor, decode_cursor, \
+                                  stream_ndjson, MIN_DATETIME, MAX_DATETIME
+from api_server.wallet import generate_address, generate_addresses, \
+                              derive_address, derive_addresses
 
 
 callback_router = APIRouter()
@@ -23,9 +28,37 @@ async def callback_notification(body: schemas.CallbackBody) -> Any:
     pass
 
 
+@callback_router.post(
+    "CALLBACK_URL_from_settings (CALLBACK_BATCH mode)",
+    response_model=schemas.CallbackBatchResponse
+)
+async def batch_callback_notification(body: schemas.CallbackBatch) -> Any:
+    pass
+
+
 router = APIRouter()
 
 
+def get_exchange_rate(needed: bool) -> Decimal | None:
+    if not needed:
+        return None
+
+    exchange_rate = rates.get("BTCUSD")
+    if exchange_rate is None:
+        raise HTTPException(status_code=503,
+                            detail="Exchange rate is unavailable")
+    return exchange_rate
+
+
+def usd_to_btc(usd_amount: Decimal | None,
+               exchange_rate: Decimal | None) -> Decimal | None:
+    if not usd_amount:
+        return None
+
+    amount = usd_amount / exchange_rate
+    return amount.quantize(Decimal("0.00000000"))
+
+
 @router.post(
     "",
     response_model=schemas.AddressOut,
@@ -33,40 +66,137 @@ router = APIRouter()
 )
 async def create_address(body: schemas.AddressIn) -> Any:
     order_id = body.order_id
-
-    wallet = Wallet()
-    if settings.TESTNET:
-        address = wallet.address.testnet.pubaddrtb1_P2WPKH
-        priv_key = wallet.key.testnet.wifc
-    else:
-        address = wallet.address.mainnet.pubaddrbc1_P2WPKH
-        priv_key = wallet.key.mainnet.wifc
-
-    priv_key = settings.CIPHER.encrypt(priv_key.encode(encoding="utf-8")).hex()
+    exchange_rate = get_exchange_rate(bool(body.usd_amount))
 
     async with database.pool.acquire() as connection:
         async with connection.transaction():
             try:
-                coros = (
-                    connection.fetchrow(
-                        Queries.insert_address,
-                        address, priv_key, order_id
-                    ),
-                    cache.set(address, order_id),
-                    cache.get("BTCUSD")
+                payment = await connection.fetchrow(
+                    Queries.claim_address,
+                    order_id, settings.ADDRESS_LIFETIME
                 )
+                if payment is None and settings.HD_XPUB:
+                    index = await connection.fetchval(
+                        Queries.next_derivation_index)
+                    payment = await connection.fetchrow(
+                        Queries.insert_hd_address,
+                        derive_address(index), index, order_id,
+                        settings.ADDRESS_LIFETIME
+                    )
+                elif payment is None:
+                    address, priv_key = await run_in_threadpool(
+                        generate_address)
+                    payment = await connection.fetchrow(
+                        Queries.insert_address,
+                        address, priv_key, order_id,
+                        settings.ADDRESS_LIFETIME
+                    )
+                address = payment["address"]
+                await watch_set.add(cache, address, order_id,
+                                    payment["expires_at"])
 
-                payment, _, exchange_rate = await asyncio.gather(*coros)
-
-                amount = None
-                if body.usd_amount:
-                    amount = body.usd_amount / Decimal(exchange_rate.decode())
-                    amount = amount.quantize(Decimal("0.00000000"))
+                amount = usd_to_btc(body.usd_amount, exchange_rate)
 
             except UniqueViolationError:
                 raise HTTPException(status_code=400, detail="Already exists")
 
-            return schemas.AddressOut(**payment, amount=amount)
+    await cache.publish(settings.WATCH_CHANNEL, address)
+    await address_cache.set_many([payment])
+
+    return schemas.AddressOut(**payment, amount=amount)
+
+
+async def insert_addresses(connection, order_ids: list[str]):
+    if settings.HD_XPUB:
+        indexes = [
+            record[0] for record in await connection.fetch(
+                Queries.next_derivation_indexes, len(order_ids))
+        ]
+        records = await run_in_threadpool(derive_addresses, indexes)
+        addresses = [address for address, _ in records]
+        priv_keys = [None] * len(order_ids)
+    else:
+        records = await run_in_threadpool(generate_addresses, len(order_ids))
+        addresses = [address for address, _ in records]
+        priv_keys = [priv_key for _, priv_key in records]
+        indexes = [None] * len(order_ids)
+
+    return await connection.fetch(
+        Queries.insert_addresses,
+        addresses, priv_keys, indexes, order_ids,
+        settings.ADDRESS_LIFETIME
+    )
+
+
+@router.post(
+    "/batch",
+    response_model=list[schemas.AddressBatchItem]
+)
+async def create_addresses(body: list[schemas.AddressIn]) -> Any:
+    if len(body) > settings.ADDRESS_BATCH_LIMIT:
+        raise HTTPException(status_code=400, detail="Too many addresses")
+
+    exchange_rate = get_exchange_rate(any(item.usd_amount for item in body))
+    items = {item.order_id: item for item in reversed(body)}
+
+    async with database.pool.acquire() as connection:
+        for attempt in range(3):
+            try:
+                async with connection.transaction():
+                    existing = await connection.fetch(Queries.find_order_ids,
+                                                      list(items))
+                    existing = {record["order_id"] for record in existing}
+                    order_ids = [
+                        order_id for order_id in items
+                        if order_id not in existing
+                    ]
+
+                    rows = await connection.fetch(Queries.claim_addresses,
+                                                  order_ids,
+                                                  settings.ADDRESS_LIFETIME)
+                    claimed = {row["order_id"] for row in rows}
+                    missing = [
+                        order_id for order_id in order_ids
+                        if order_id not in claimed
+                    ]
+                    if missing:
+                        rows += await insert_addresses(connection, missing)
+
+                    await watch_set.add_many(cache, rows)
+                break
+            except UniqueViolationError:
+                if attempt == 2:
+                    raise HTTPException(status_code=409,
+                                        detail="Concurrent update, retry")
+
+    pipe = cache.pipeline(transaction=False)
+    for row in rows:
+        pipe.publish(settings.WATCH_CHANNEL, row["address"])
+    await pipe.execute()
+    await address_cache.set_many(rows)
+
+    rows = {row["order_id"]: row for row in rows}
+    results = []
+    for item in body:
+        if item.order_id in existing:
+            error = "Already exists"
+        elif item.order_id not in rows:
+            error = "Duplicate order_id in batch"
+        else:
+            row = rows.pop(item.order_id)
+            results.append(schemas.AddressBatchItem(
+                order_id=item.order_id,
+                address=schemas.AddressOut(
+                    **row,
+                    amount=usd_to_btc(item.usd_amount, exchange_rate)
+                )
+            ))
+            continue
+
+        results.append(schemas.AddressBatchItem(order_id=item.order_id,
+                                                error=error))
+
+    return results
 
 
 @router.get(
@@ -74,23 +204,47 @@ async def create_address(body: schemas.AddressIn) -> Any:
     response_model=schemas.AddressOut,
 )
 async def read_address(address: str) -> Any:
-    async with database.pool.acquire() as connection:
-        payment = await connection.fetchrow(Queries.select_address, address)
-        if payment:
-            return payment
+    key = f"address:{address}"
+    payment = await address_cache.get(key)
+    if payment is None:
+        async with database.pool.acquire() as connection:
+            payment = await connection.fetchrow(Queries.select_address,
+                                                address)
+        await address_cache.set(key, payment)
+
+    if payment:
+        return payment
 
     raise HTTPException(404, detail="Address not found")
 
 
 @router.get(
     "",
-    response_model=schemas.AddressOut,
+    response_model=schemas.AddressOut | schemas.AddressPage,
 )
-async def find_address(order_id: str) -> Any:
-    async with database.pool.acquire() as connection:
-        payment = await connection.fetchrow(Queries.find_address, order_id)
-        if payment:
-            return payment
+async def find_address(
+    order_id: str = None,
+    since: datetime = None,
+    until: datetime = None,
+    status: Literal["paid", "unpaid"] = None,
+    cursor: str = None,
+    limit: int = Query(100, ge=1, le=settings.PAGE_LIMIT_MAX),
+    format: Literal["json", "ndjson"] = "json"
+) -> Any:
+    if order_id is None:
+        return await list_addresses(since, until, status, cursor, limit,
+                                    format)
+
+    key = f"order:{order_id}"
+    payment = await address_cache.get(key)
+    if payment is None:
+        async with database.pool.acquire() as connection:
+            payment = await connection.fetchrow(Queries.find_address,
+                                                order_id)
+        await address_cache.set(key, payment)
+
+    if payment:
+        return payment
 
     raise HTTPException(404, detail="Address not found")
 
@@ -107,3 +261,58 @@ async def read_address_payments(address: str) -> Any:
             return payments
 
     raise HTTPException(404, detail="Payments not found")
+
+
+async def list_addresses(since, until, status, cursor, limit, format):
+    after, key = since or MIN_DATETIME, ""
+    if cursor:
+        after, key = decode_cursor(cursor)
+    args = [after, key, until or MAX_DATETIME, status]
+
+    if format == "ndjson":
+        return stream_ndjson(Queries.list_addresses, args + [None],
+                             schemas.AddressOut)
+
+    async with database.pool.acquire() as connection:
+        rows = await connection.fetch(Queries.list_addresses, *args, limit)
+
+    next_cursor = None
+    if len(rows) == limit:
+        next_cursor = encode_cursor(rows[-1]["dt_created"],
+                                    rows[-1]["address"])
+    return schemas.AddressPage(items=rows, next_cursor=next_cursor)
+
+
+payments_router = APIRouter()
+
+
+@payments_router.get(
+    "",
+    response_model=schemas.PaymentPage
+)
+async def list_payments(
+    since: datetime = None,
+    until: datetime = None,
+    status: Literal["pending", "confirmed", "forwarded"] = None,
+    cursor: str = None,
+    limit: int = Query(100, ge=1, le=settings.PAGE_LIMIT_MAX),
+    format: Literal["json", "ndjson"] = "json"
+) -> Any:
+    after, key = since or MIN_DATETIME, 0
+    if cursor:
+        after, key = decode_cursor(cursor)
+        if not key.isdigit():
+            raise HTTPException(400, detail="Invalid cursor")
+    args = [after, int(key), until or MAX_DATETIME, status]
+
+    if format == "ndjson":
+        return stream_ndjson(Queries.list_payments, args + [None],
+                             schemas.PaymentOut)
+
+    async with database.pool.acquire() as connection:
+        rows = await connection.fetch(Queries.list_payments, *args, limit)
+
+    next_cursor = None
+    if len(rows) == limit:
+        next_cursor = encode_cursor(rows[-1]["dt_created"], rows[-1]["id"])
+    return schemas.PaymentPage(items=rows, next_cursor=next_cursor)
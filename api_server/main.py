@@ -1,22 +1,48 @@
+import time
 import asyncio
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 
+from settings import settings
+from metrics import HTTP_REQUEST_LATENCY, metrics_app
 from api_server import endpoints
-from api_server.deps import database, cache
+from api_server.deps import database, cache, address_cache, rates
 
 
 app = FastAPI()
 app.include_router(endpoints.router, prefix="/addresses")
+app.include_router(endpoints.payments_router, prefix="/payments")
+app.mount("/metrics", metrics_app())
+
+
+@app.middleware("http")
+async def observe_latency(request: Request, call_next):
+    started = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        route = request.scope.get("route")
+        HTTP_REQUEST_LATENCY.labels(
+            request.method,
+            route.path if route else "unmatched",
+            status
+        ).observe(time.perf_counter() - started)
 
 
 @app.on_event("startup")
 async def startup_event():
     await database.connect()
+    rates.start(cache, settings.RATE_SYMBOLS)
+    address_cache.start()
 
 
 @app.on_event("shutdown")
 async def shutdown_event():
-    asyncio.gather(
+    await asyncio.gather(
+        rates.stop(),
+        address_cache.stop(),
         database.disconnect(),
         cache.close()
     )
@@ -0,0 +1,46 @@
+import base64
+from datetime import datetime, timezone
+
+from fastapi import HTTPException
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+
+from settings import settings
+from api_server.deps import database
+
+
+MIN_DATETIME = datetime.min.replace(tzinfo=timezone.utc)
+MAX_DATETIME = datetime.max.replace(tzinfo=timezone.utc)
+
+
+def encode_cursor(dt_created: datetime, key) -> str:
+    raw = f"{dt_created.isoformat()}|{key}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, str]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode()).decode()
+        dt_created, key = raw.split("|", 1)
+        return datetime.fromisoformat(dt_created), key
+    except ValueError:
+        raise HTTPException(400, detail="Invalid cursor")
+
+
+def stream_ndjson(query: str, args: list,
+                  schema: type[BaseModel]) -> StreamingResponse:
+    async def generate():
+        async with database.pool.acquire() as connection:
+            async with connection.transaction(isolation="repeatable_read",
+                                              readonly=True):
+                lines = []
+                async for row in connection.cursor(
+                        query, *args, prefetch=settings.EXPORT_PREFETCH):
+                    lines.append(schema(**row).json())
+                    if len(lines) == settings.EXPORT_PREFETCH:
+                        yield "\n".join(lines) + "\n"
+                        lines = []
+                if lines:
+                    yield "\n".join(lines) + "\n"
+
+    return StreamingResponse(generate(), media_type="application/x-ndjson")
@@ -0,0 +1,58 @@
+import json
+import time
+import asyncio
+import logging
+from decimal import Decimal
+
+from redis.asyncio import Redis
+
+
+class ExchangeRates:
+    def __init__(self, channel: str, max_age: float):
+        self.channel = channel
+        self.max_age = max_age
+        self.rates: dict[str, tuple[Decimal, float]] = {}
+        self.task: asyncio.Task = None
+
+    def update(self, symbol: str, price: str, timestamp: float):
+        current = self.rates.get(symbol)
+        if current is None or current[1] <= timestamp:
+            self.rates[symbol] = (Decimal(price), timestamp)
+
+    def get(self, symbol: str) -> Decimal | None:
+        rate = self.rates.get(symbol)
+        if rate is None or time.time() - rate[1] > self.max_age:
+            return None
+        return rate[0]
+
+    async def load(self, redis: Redis, symbol: str):
+        price, timestamp = await redis.mget(symbol, f"{symbol}:time")
+        if price and timestamp:
+            self.update(symbol, price.decode(), float(timestamp))
+
+    async def listen(self, redis: Redis, symbols: list[str]):
+        while True:
+            try:
+                async with redis.pubsub() as pubsub:
+                    await pubsub.subscribe(self.channel)
+                    for symbol in symbols:
+                        await self.load(redis, symbol)
+                    async for message in pubsub.listen():
+                        if message["type"] != "message":
+                            continue
+                        data = json.loads(message["data"])
+                        self.update(data["symbol"], data["price"],
+                                    data["time"])
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logging.exception("Exchange rate subscription failed")
+                await asyncio.sleep(1)
+
+    def start(self, redis: Redis, symbols: list[str]):
+        self.task = asyncio.create_task(self.listen(redis, symbols))
+
+    async def stop(self):
+        if self.task:
+            self.task.cancel()
+            await asyncio.gather(self.task, return_exceptions=True)
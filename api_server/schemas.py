@@ -17,6 +17,14 @@ class CallbackResponse(BaseModel):
     stop: bool
 
 
+class CallbackBatch(BaseModel):
+    __root__: list[CallbackBody]
+
+
+class CallbackBatchResponse(BaseModel):
+    items: list[CallbackResponse]
+
+
 class AddressIn(BaseModel):
     order_id: str = Field(max_length=50,
                           example="3469aa76-2082-421b-8e54-0bb93424ae76")
@@ -43,6 +51,22 @@ class AddressOut(BaseModel):
         }
 
 
+class AddressBatchItem(BaseModel):
+    order_id: str
+    address: AddressOut = None
+    error: str = None
+
+
+class AddressPage(BaseModel):
+    items: list[AddressOut]
+    next_cursor: str = None
+
+    class Config:
+        json_encoders = {
+            datetime: lambda v: v.isoformat(timespec='seconds')
+        }
+
+
 class PaymentOut(BaseModel):
     dt_created: datetime
     txid: str
@@ -50,7 +74,18 @@ class PaymentOut(BaseModel):
     amount: Decimal
     address: str
     order_id: str
-    forward_txid: str
+    forward_txid: str = None
+    block_height: int = None
+
+    class Config:
+        json_encoders = {
+            datetime: lambda v: v.isoformat(timespec='seconds')
+        }
+
+
+class PaymentPage(BaseModel):
+    items: list[PaymentOut]
+    next_cursor: str = None
 
     class Config:
         json_encoders = {
@@ -0,0 +1,46 @@
+from functools import lru_cache
+
+from bitcoinaddress import Wallet
+
+from settings import settings
+from btc.hdwallet import ExtendedKey
+
+
+def generate_address() -> tuple[str, str]:
+    wallet = Wallet()
+    if settings.TESTNET:
+        address = wallet.address.testnet.pubaddrtb1_P2WPKH
+        priv_key = wallet.key.testnet.wifc
+    else:
+        address = wallet.address.mainnet.pubaddrbc1_P2WPKH
+        priv_key = wallet.key.mainnet.wifc
+
+    priv_key = settings.CIPHER.encrypt(priv_key.encode(encoding="utf-8")).hex()
+    return address, priv_key
+
+
+def generate_addresses(count: int) -> list[tuple[str, str]]:
+    return [generate_address() for _ in range(count)]
+
+
+@lru_cache
+def external_chain(extended_key: str) -> ExtendedKey:
+    return ExtendedKey.parse(extended_key).child(0)
+
+
+def derive_address(index: int) -> str:
+    key = external_chain(settings.HD_XPUB).child(index)
+    return key.address(settings.TESTNET)
+
+
+def derive_addresses(indexes: list[int]) -> list[tuple[str, int]]:
+    return [(derive_address(index), index) for index in indexes]
+
+
+def get_private_key(priv_key: str | None, derivation_index: int | None) -> str:
+    if derivation_index is not None:
+        key = external_chain(settings.HD_XPRV).child(derivation_index)
+        return key.wif(settings.TESTNET)
+
+    key_bytes = bytes.fromhex(priv_key)
+    return settings.CIPHER.decrypt(key_bytes).decode(encoding="utf-8")
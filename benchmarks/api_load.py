@@ -0,0 +1,247 @@
+import json
+import time
+import uuid
+import random
+import argparse
+import asyncio
+import threading
+import subprocess
+import statistics
+from datetime import datetime, timezone
+
+import aiohttp
+import asyncpg
+import uvicorn
+from redis.asyncio import Redis
+
+import watch_set
+from settings import settings
+from api_server.cache import invalidate
+from api_server.wallet import generate_address
+from benchmarks import network_e2e
+
+
+ORDER_PREFIX = f"{network_e2e.ORDER_PREFIX}load-"
+
+
+class LagMonitor:
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        self.samples: list[float] = []
+
+    async def run(self):
+        while True:
+            started = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            self.samples.append(
+                time.perf_counter() - started - self.interval)
+
+    def reset(self) -> list[float]:
+        samples, self.samples = self.samples, []
+        return samples
+
+
+class ServerThread(threading.Thread):
+    def __init__(self, app, port: int, monitor: LagMonitor):
+        super().__init__(daemon=True)
+        self.monitor = monitor
+        self.server = uvicorn.Server(uvicorn.Config(
+            app, host="127.0.0.1", port=port, log_level="warning"))
+
+    async def serve(self):
+        monitor = asyncio.create_task(self.monitor.run())
+        await self.server.serve()
+        monitor.cancel()
+
+    def run(self):
+        asyncio.run(self.serve())
+
+    def stop(self):
+        self.server.should_exit = True
+        self.join()
+
+
+def summary(values: list[float]) -> dict:
+    if len(values) < 2:
+        return {}
+    cuts = statistics.quantiles(values, n=100)
+    return {
+        "p50": statistics.median(values),
+        "p90": cuts[89],
+        "p99": cuts[98],
+        "max": max(values)
+    }
+
+
+def blocking_costs(samples: int = 20) -> dict:
+    started = time.perf_counter()
+    for _ in range(samples):
+        _, priv_key = generate_address()
+    generate = (time.perf_counter() - started) / samples
+
+    token = bytes.fromhex(priv_key)
+    started = time.perf_counter()
+    for _ in range(samples * 50):
+        settings.CIPHER.decrypt(token)
+    decrypt = (time.perf_counter() - started) / (samples * 50)
+
+    started = time.perf_counter()
+    for _ in range(samples * 50):
+        settings.CIPHER.encrypt(b"x" * 52)
+    encrypt = (time.perf_counter() - started) / (samples * 50)
+
+    return {
+        "generate_address_ms": generate * 1000,
+        "fernet_encrypt_ms": encrypt * 1000,
+        "fernet_decrypt_ms": decrypt * 1000
+    }
+
+
+async def run_scenario(session: aiohttp.ClientSession, base_url: str,
+                       scenario: str, concurrency: int, duration: float,
+                       created: list[dict], monitor: LagMonitor) -> dict:
+    latencies: list[float] = []
+    errors = 0
+
+    def request():
+        if scenario == "create":
+            return session.post(f"{base_url}/addresses", json={
+                "order_id": f"{ORDER_PREFIX}{uuid.uuid4()}"})
+        item = random.choice(created)
+        if scenario == "read_address":
+            return session.get(f"{base_url}/addresses/{item['address']}")
+        if scenario == "find_order":
+            return session.get(f"{base_url}/addresses",
+                               params={"order_id": item["order_id"]})
+        return session.get(f"{base_url}/payments", params={"limit": 100})
+
+    async def worker(deadline: float):
+        nonlocal errors
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            async with request() as response:
+                body = await response.read()
+            latencies.append(time.perf_counter() - started)
+            if response.status != 200:
+                errors += 1
+            elif scenario == "create":
+                created.append(json.loads(body))
+
+    monitor.reset()
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(started + duration)
+                           for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    return {
+        "scenario": scenario,
+        "concurrency": concurrency,
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": len(latencies) / elapsed,
+        "latency": summary(latencies),
+        "loop_lag": summary(monitor.reset())
+    }
+
+
+async def cleanup(db_conn: asyncpg.Connection, redis: Redis):
+    rows = await db_conn.fetch(
+        f"select address, order_id, expires_at from addresses "
+        f"where order_id like '{ORDER_PREFIX}%'")
+    if rows:
+        await watch_set.remove_many(redis, rows)
+        await invalidate(redis, settings.ADDRESS_CACHE_CHANNEL, [
+            key for row in rows
+            for key in (f"address:{row['address']}",
+                        f"order:{row['order_id']}")
+        ])
+    await db_conn.execute(
+        f"delete from addresses where order_id like '{ORDER_PREFIX}%'")
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"],
+                              capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def run(args) -> dict:
+    db_conn, redis = await network_e2e.connect(args)
+    await cleanup(db_conn, redis)
+
+    settings.DATABASE_URI = args.database_url
+    settings.REDIS_HOST = args.redis_host
+    from api_server.main import app
+
+    monitor = LagMonitor()
+    server = ServerThread(app, args.port, monitor)
+    server.start()
+    while not server.server.started:
+        await asyncio.sleep(0.05)
+
+    base_url = f"http://127.0.0.1:{args.port}"
+    created: list[dict] = []
+    results = []
+    try:
+        connector = aiohttp.TCPConnector(limit=0)
+        async with aiohttp.ClientSession(connector=connector) as session:
+            for scenario in args.scenarios:
+                for concurrency in args.concurrency:
+                    if scenario != "create" and not created:
+                        await run_scenario(session, base_url, "create", 1,
+                                           1, created, monitor)
+                    result = await run_scenario(
+                        session, base_url, scenario, concurrency,
+                        args.duration, created, monitor)
+                    results.append(result)
+                    print(f"{scenario:>13} c={concurrency:<4} "
+                          f"{result['rps']:8.0f} req/s  "
+                          f"p99 {result['latency'].get('p99', 0) * 1000:7.1f}"
+                          f" ms  loop lag max "
+                          f"{result['loop_lag'].get('max', 0) * 1000:6.1f}"
+                          f" ms  errors {result['errors']}")
+    finally:
+        server.stop()
+        await cleanup(db_conn, redis)
+        await db_conn.close()
+        await redis.close()
+
+    return {
+        "commit": git_commit(),
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "duration": args.duration,
+        "results": results,
+        "blocking": blocking_costs()
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Load test the api against a dedicated Postgres and "
+                    "Redis"
+    )
+    network_e2e.add_store_arguments(parser)
+    parser.add_argument("--scenarios", nargs="+",
+                        default=["create", "read_address", "find_order",
+                                 "payments"],
+                        choices=["create", "read_address", "find_order",
+                                 "payments"])
+    parser.add_argument("--concurrency", nargs="+", type=int,
+                        default=[1, 10, 50])
+    parser.add_argument("--duration", type=float, default=5)
+    parser.add_argument("--port", type=int, default=18000)
+    parser.add_argument("--output", default="api_load.json")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+    with open(args.output, "w") as output:
+        json.dump(report, output, indent=2)
+    print(f"blocking costs: {report['blocking']}")
+    print(f"results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+import argparse
+import asyncio
+import random
+import time
+
+import aiohttp
+
+from btc.transaction import decode_transaction
+from benchmarks.txgen import make_transaction, random_address
+
+
+def make_sample(count: int, testnet: bool) -> list[bytes]:
+    sample = []
+    for _ in range(count):
+        outputs = [
+            (random_address(testnet), random.randint(546, 10 ** 8))
+            for _ in range(random.randint(1, 4))
+        ]
+        sample.append(make_transaction(outputs, testnet,
+                                       inputs=random.randint(1, 3)))
+    return sample
+
+
+def bench_local(sample: list[bytes], testnet: bool) -> float:
+    started = time.perf_counter()
+    for raw in sample:
+        decode_transaction(raw, testnet)
+    return len(sample) / (time.perf_counter() - started)
+
+
+async def bench_rpc(sample: list[bytes], concurrency: int) -> float:
+    from settings import settings
+
+    semafore = asyncio.Semaphore(concurrency)
+
+    async def decode(session: aiohttp.ClientSession, raw: bytes):
+        async with semafore:
+            async with session.post(
+                settings.RPC_PROVIDER,
+                json={
+                    "jsonrpc": "1.0",
+                    "id": "0",
+                    "method": "decoderawtransaction",
+                    "params": [raw.hex()],
+                },
+            ) as response:
+                resp_json = await response.json()
+                return resp_json["result"]
+
+    async with aiohttp.ClientSession(
+        timeout=aiohttp.ClientTimeout(total=15),
+        auth=aiohttp.BasicAuth(settings.RPC_USER, settings.RPC_PASSWORD),
+    ) as session:
+        started = time.perf_counter()
+        await asyncio.gather(*(decode(session, raw) for raw in sample))
+        return len(sample) / (time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Compare local transaction decoding with "
+                    "decoderawtransaction over RPC"
+    )
+    parser.add_argument("--count", type=int, default=20000)
+    parser.add_argument("--testnet", action="store_true")
+    parser.add_argument("--rpc", action="store_true",
+                        help="also benchmark the node from .env settings")
+    parser.add_argument("--concurrency", type=int, default=10)
+    args = parser.parse_args()
+
+    sample = make_sample(args.count, args.testnet)
+    print(f"local: {bench_local(sample, args.testnet):.0f} tx/s")
+    if args.rpc:
+        rate = asyncio.run(bench_rpc(sample, args.concurrency))
+        print(f"rpc:   {rate:.0f} tx/s")
+
+
+if __name__ == "__main__":
+    main()
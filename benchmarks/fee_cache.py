@@ -0,0 +1,33 @@
+import argparse
+import asyncio
+
+from benchmarks import network_e2e
+
+
+def report(label: str, node):
+    print(f"{label + ':':<15}{node.calls['estimatesmartfee']} "
+          f"estimatesmartfee calls for {len(node.chain) - 1} blocks and "
+          f"{node.calls['sendrawtransaction']} sweeps sent")
+
+
+async def run(args):
+    env = {"SWEEP_INTERVAL": str(args.sweep_interval)}
+    uncached = await network_e2e.run(args, {**env, "FEE_CACHE_MAX_AGE": "0"})
+    cached = await network_e2e.run(args, env)
+    report("without cache", uncached)
+    report("with cache", cached)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Count estimatesmartfee calls made by sweeps and block "
+                    "handling in the network daemon with and without the "
+                    "fee rate cache (FEE_CACHE_MAX_AGE=0)"
+    )
+    network_e2e.add_arguments(parser)
+    parser.add_argument("--sweep-interval", type=float, default=1)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
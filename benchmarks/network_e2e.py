@@ -0,0 +1,318 @@
+import os
+import sys
+import time
+import uuid
+import random
+import signal
+import argparse
+import asyncio
+import statistics
+from datetime import datetime, timedelta, timezone
+
+import asyncpg
+from redis.asyncio import Redis
+
+import watch_set
+from settings import settings
+from database.sql import Queries
+from daemons.network import CHECKPOINT
+from btc.transaction import decode_transaction
+from api_server.wallet import generate_address
+from benchmarks.txgen import make_transaction, random_address
+from benchmarks.stubs import FakeBitcoind, ZmqPublisher, CallbackSink, serve
+
+
+ORDER_PREFIX = "bench-"
+
+
+def rss(pid: int) -> int:
+    with open(f"/proc/{pid}/status") as status:
+        for line in status:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) * 1024
+    return 0
+
+
+def percentile(values: list[float], fraction: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+async def provision(db_conn: asyncpg.Connection, redis: Redis,
+                    count: int) -> list[str]:
+    _, priv_key = generate_address()
+    expires_at = datetime.now(timezone.utc) + timedelta(days=1)
+    rows = [
+        {
+            "address": random_address(settings.TESTNET),
+            "order_id": f"{ORDER_PREFIX}{uuid.uuid4()}",
+            "expires_at": expires_at
+        }
+        for _ in range(count)
+    ]
+    await db_conn.copy_records_to_table(
+        "addresses",
+        records=[
+            (row["address"], row["order_id"], priv_key, row["expires_at"])
+            for row in rows
+        ],
+        columns=["address", "order_id", "priv_key", "expires_at"]
+    )
+    await watch_set.add_many(redis, rows)
+    return [row["address"] for row in rows]
+
+
+async def check_dedicated(db_conn: asyncpg.Connection, redis: Redis):
+    payments = await db_conn.fetchval(
+        f"select count(*) from payments "
+        f"where order_id not like '{ORDER_PREFIX}%'")
+    if payments:
+        raise Exception(f"database has {payments} payments not made by a "
+                        f"benchmark, use a dedicated one")
+    if await redis.exists(settings.LEADER_LOCK_KEY):
+        raise Exception("a network daemon holds the leader lock in redis, "
+                        "stop it or wait for the lock to expire")
+    async for key in redis.scan_iter(f"{watch_set.PREFIX}*"):
+        async for _, order_id in redis.hscan_iter(key):
+            if not order_id.startswith(ORDER_PREFIX.encode()):
+                raise Exception("redis watch set has addresses not made by "
+                                "a benchmark, use a dedicated redis")
+
+
+async def connect(args) -> tuple[asyncpg.Connection, Redis]:
+    db_conn = await asyncpg.connect(dsn=args.database_url)
+    redis = Redis(host=args.redis_host)
+    try:
+        await check_dedicated(db_conn, redis)
+    except Exception:
+        await db_conn.close()
+        await redis.close()
+        raise
+    return db_conn, redis
+
+
+async def cleanup(db_conn: asyncpg.Connection, redis: Redis):
+    rows = await db_conn.fetch(
+        f"select address, expires_at from addresses "
+        f"where order_id like '{ORDER_PREFIX}%'")
+    await watch_set.remove_many(redis, rows)
+    await redis.delete(settings.LEADER_LOCK_KEY)
+    await db_conn.execute(f"""
+        delete from callbacks where payment_id in (
+            select id from payments where order_id like '{ORDER_PREFIX}%'
+        ) or payment_ids && array(
+            select id from payments where order_id like '{ORDER_PREFIX}%'
+        )
+    """)
+    await db_conn.execute(
+        f"delete from payments where order_id like '{ORDER_PREFIX}%'")
+    await db_conn.execute(
+        f"delete from addresses where order_id like '{ORDER_PREFIX}%'")
+
+
+async def replace_checkpoint(db_conn: asyncpg.Connection, height: int,
+                             block_hash: str) -> asyncpg.Record | None:
+    previous = await db_conn.fetchrow(Queries.select_checkpoint, CHECKPOINT)
+    await db_conn.execute(Queries.update_checkpoint, CHECKPOINT, height,
+                          block_hash)
+    return previous
+
+
+async def restore_checkpoint(db_conn: asyncpg.Connection,
+                             previous: asyncpg.Record | None):
+    if previous is None:
+        await db_conn.execute("delete from checkpoints where name = $1",
+                              CHECKPOINT)
+    else:
+        await db_conn.execute(Queries.update_checkpoint, CHECKPOINT,
+                              *previous)
+
+
+def describe(tx) -> dict:
+    return {
+        "txid": tx.txid,
+        "vout": [
+            {
+                "n": vout.n,
+                "value": float(vout.value),
+                "scriptPubKey": {"address": vout.address}
+            }
+            for vout in tx.vout
+        ]
+    }
+
+
+async def start_daemon(module: str, env: dict) -> asyncio.subprocess.Process:
+    return await asyncio.create_subprocess_exec(
+        sys.executable, "-m", module, env={**os.environ, **env})
+
+
+async def stop_daemons(processes: list[asyncio.subprocess.Process],
+                       timeout: float = 10):
+    for process in processes:
+        process.send_signal(signal.SIGTERM)
+    for process in processes:
+        try:
+            await asyncio.wait_for(process.wait(), timeout)
+        except asyncio.TimeoutError:
+            process.kill()
+            await process.wait()
+
+
+async def wait_for(predicate, timeout: float) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if await predicate():
+            return True
+        await asyncio.sleep(0.05)
+    return False
+
+
+async def run(args, overrides: dict = None) -> FakeBitcoind:
+    node = FakeBitcoind()
+    sink = CallbackSink(args.sink_latency)
+    sink.expected = args.payments
+    publisher = ZmqPublisher(f"tcp://127.0.0.1:{args.zmq_port}")
+    runners = [await serve(node.handle, args.rpc_port),
+               await serve(sink.handle, args.sink_port)]
+
+    db_conn, redis = await connect(args)
+    await cleanup(db_conn, redis)
+    addresses = await provision(db_conn, redis, args.payments)
+
+    txs = []
+    for address in addresses:
+        raw = make_transaction([(address, random.randint(10 ** 5, 10 ** 7))],
+                               settings.TESTNET)
+        tx = decode_transaction(raw, settings.TESTNET)
+        node.transactions[tx.txid] = describe(tx)
+        txs.append((tx.txid, raw))
+    checkpoint = await replace_checkpoint(db_conn, 0, node.tip)
+
+    env = {
+        "DATABASE_URI": args.database_url,
+        "REDIS_HOST": args.redis_host,
+        "RPC_PROVIDER": f"http://127.0.0.1:{args.rpc_port}",
+        "ZMQ_SOCKET": f"tcp://127.0.0.1:{args.zmq_port}",
+        "CALLBACK_URL": f"http://127.0.0.1:{args.sink_port}/callback",
+        "CALLBACK_POLL_INTERVAL": "0.05",
+        "SWEEP_INTERVAL": "1",
+        **(overrides or {})
+    }
+    network = await start_daemon("daemons.network",
+                                 {**env, "METRICS_PORT": "9181"})
+    callbacks = await start_daemon("daemons.callbacks",
+                                   {**env, "METRICS_PORT": "9180"})
+
+    try:
+        async def chain_ready():
+            return node.calls["getblock"] > 0
+
+        if not await wait_for(chain_ready, args.timeout):
+            raise Exception("network daemon did not start")
+        await asyncio.sleep(1)
+
+        rss_before = rss(network.pid)
+        calls_before = sum(node.calls.values())
+        published: dict[str, float] = {}
+        started = time.perf_counter()
+
+        async def publish_blocks():
+            while True:
+                await asyncio.sleep(args.block_interval)
+                await publisher.publish(b"hashblock",
+                                        bytes.fromhex(node.mine()))
+
+        blocks = asyncio.create_task(publish_blocks())
+        for idx, (txid, raw) in enumerate(txs):
+            if args.rate:
+                delay = started + idx / args.rate - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            published[txid] = time.perf_counter()
+            node.mempool.append(txid)
+            await publisher.publish(b"rawtx", raw)
+
+        async def ingested():
+            count = await db_conn.fetchval(
+                f"select count(*) from payments "
+                f"where order_id like '{ORDER_PREFIX}%'")
+            return count >= args.payments
+
+        ingest_done = await wait_for(ingested, args.timeout)
+        ingest_elapsed = time.perf_counter() - started
+        try:
+            await asyncio.wait_for(sink.event.wait(), args.timeout)
+        except asyncio.TimeoutError:
+            pass
+
+        await asyncio.sleep(args.block_interval * 2)
+        blocks.cancel()
+        rss_after = rss(network.pid)
+        calls = sum(node.calls.values()) - calls_before
+
+    finally:
+        await stop_daemons([network, callbacks])
+        await cleanup(db_conn, redis)
+        await restore_checkpoint(db_conn, checkpoint)
+        await db_conn.close()
+        await redis.close()
+        publisher.close()
+        for runner in runners:
+            await runner.cleanup()
+
+    latencies = [
+        sink.arrivals[txid] - published[txid]
+        for txid in published if txid in sink.arrivals
+    ]
+    received = len(latencies)
+    print(f"payments:             {args.payments}")
+    print(f"ingested:             {'all' if ingest_done else 'timeout'} "
+          f"in {ingest_elapsed:.2f}s, "
+          f"{args.payments / ingest_elapsed:.0f} tx/s")
+    print(f"callbacks received:   {received} payments, "
+          f"{sink.count} deliveries")
+    if latencies:
+        print(f"zmq to callback p50:  {statistics.median(latencies):.3f}s")
+        print(f"zmq to callback p99:  {percentile(latencies, 0.99):.3f}s")
+    print(f"rpc calls per payment: {calls / args.payments:.3f} "
+          f"({dict(node.calls)})")
+    print(f"network daemon rss:   {rss_before / 2 ** 20:.1f} MiB -> "
+          f"{rss_after / 2 ** 20:.1f} MiB")
+    return node
+
+
+def add_store_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument("--database-url", required=True,
+                        help="dedicated Postgres database, refused if it "
+                             "has payments not made by a benchmark")
+    parser.add_argument("--redis-host", required=True,
+                        help="dedicated Redis, refused if its watch set has "
+                             "addresses not made by a benchmark")
+
+
+def add_arguments(parser: argparse.ArgumentParser):
+    add_store_arguments(parser)
+    parser.add_argument("--payments", type=int, default=2000)
+    parser.add_argument("--rate", type=float, default=0,
+                        help="rawtx per second, 0 publishes at full speed")
+    parser.add_argument("--block-interval", type=float, default=2)
+    parser.add_argument("--sink-latency", type=float, default=0.01)
+    parser.add_argument("--rpc-port", type=int, default=18443)
+    parser.add_argument("--zmq-port", type=int, default=28332)
+    parser.add_argument("--sink-port", type=int, default=18080)
+    parser.add_argument("--timeout", type=float, default=120)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="End-to-end NetworkDaemon throughput with a fake "
+                    "bitcoind, ZMQ publisher and callback sink, using a "
+                    "dedicated Postgres and Redis"
+    )
+    add_arguments(parser)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+import os
+import time
+import random
+import argparse
+import asyncio
+
+from settings import settings
+from benchmarks.txgen import random_address
+from benchmarks.stubs import FakeBitcoind, serve
+from benchmarks.network_e2e import ORDER_PREFIX, add_store_arguments, \
+                                   connect, provision, cleanup, \
+                                   start_daemon, stop_daemons, wait_for, \
+                                   replace_checkpoint, restore_checkpoint
+
+
+def build_chain(node: FakeBitcoind, watched: list[str], blocks: int,
+                outputs: int) -> int:
+    others = [random_address(settings.TESTNET) for _ in range(1000)]
+    payments = iter(watched)
+    per_block = -(-len(watched) // blocks)
+    total = 0
+
+    for _ in range(blocks):
+        for idx in range(outputs // 2):
+            addresses = [random.choice(others), random.choice(others)]
+            if idx < per_block and (address := next(payments, None)):
+                addresses[0] = address
+                total += 1
+            txid = os.urandom(32).hex()
+            node.transactions[txid] = {
+                "txid": txid,
+                "vout": [
+                    {
+                        "n": n,
+                        "value": random.randint(10 ** 4, 10 ** 7) / 10 ** 8,
+                        "scriptPubKey": {"address": address}
+                    }
+                    for n, address in enumerate(addresses)
+                ]
+            }
+            node.mempool.append(txid)
+        node.mine()
+
+    return total
+
+
+async def run(args):
+    node = FakeBitcoind()
+    runner = await serve(node.handle, args.rpc_port)
+
+    db_conn, redis = await connect(args)
+    await cleanup(db_conn, redis)
+    watched = await provision(db_conn, redis, args.payments)
+    checkpoint = await replace_checkpoint(db_conn, 0, node.tip)
+    expected = build_chain(node, watched, args.blocks, args.outputs)
+
+    network = await start_daemon("daemons.network", {
+        "DATABASE_URI": args.database_url,
+        "REDIS_HOST": args.redis_host,
+        "RPC_PROVIDER": f"http://127.0.0.1:{args.rpc_port}",
+        "ZMQ_SOCKET": f"tcp://127.0.0.1:{args.zmq_port}",
+        "METRICS_PORT": "9181",
+        "SWEEP_INTERVAL": "0",
+        "RESYNC_WINDOW": str(args.window),
+    })
+
+    try:
+        async def scan_started():
+            return node.calls["getblockhash"] > 0
+
+        if not await wait_for(scan_started, args.timeout):
+            raise Exception("network daemon did not start scanning")
+        started = time.perf_counter()
+
+        async def ingested():
+            count = await db_conn.fetchval(
+                f"select count(*) from payments "
+                f"where order_id like '{ORDER_PREFIX}%'")
+            return count >= expected
+
+        done = await wait_for(ingested, args.timeout)
+        elapsed = time.perf_counter() - started
+
+    finally:
+        await stop_daemons([network])
+        await cleanup(db_conn, redis)
+        await restore_checkpoint(db_conn, checkpoint)
+        await db_conn.close()
+        await redis.close()
+        await runner.cleanup()
+
+    print(f"blocks:          {args.blocks} x {args.outputs} outputs")
+    print(f"payments:        {expected} "
+          f"{'found' if done else 'not all found'}")
+    print(f"scan time:       {elapsed:.2f}s, "
+          f"{args.blocks / elapsed:.1f} blocks/s")
+    print(f"rpc calls:       {dict(node.calls)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="NetworkDaemon catch-up scan of missed blocks from a "
+                    "fake bitcoind, using a dedicated Postgres and Redis"
+    )
+    add_store_arguments(parser)
+    parser.add_argument("--blocks", type=int, default=144)
+    parser.add_argument("--outputs", type=int, default=4000,
+                        help="outputs per block")
+    parser.add_argument("--payments", type=int, default=1000)
+    parser.add_argument("--window", type=int, default=10)
+    parser.add_argument("--rpc-port", type=int, default=18443)
+    parser.add_argument("--zmq-port", type=int, default=28332)
+    parser.add_argument("--timeout", type=float, default=120)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,226 @@
+import os
+import json
+import time
+import asyncio
+import collections
+
+import zmq
+import zmq.asyncio
+from aiohttp import web
+
+
+class FakeBitcoind:
+    def __init__(self):
+        genesis = os.urandom(32).hex()
+        self.blocks = {genesis: {"hash": genesis, "height": 0,
+                                 "time": int(time.time()), "tx": []}}
+        self.chain = [genesis]
+        self.tip = genesis
+        self.mempool: list[str] = []
+        self.transactions: dict[str, dict] = {}
+        self.calls: collections.Counter = collections.Counter()
+
+    def mine(self) -> str:
+        previous = self.blocks[self.tip]
+        block_hash = os.urandom(32).hex()
+        self.blocks[block_hash] = {
+            "hash": block_hash,
+            "height": previous["height"] + 1,
+            "previousblockhash": previous["hash"],
+            "time": int(time.time()),
+            "tx": self.mempool
+        }
+        self.mempool = []
+        self.chain.append(block_hash)
+        self.tip = block_hash
+        return block_hash
+
+    def getblock(self, block_hash: str, verbosity: int = 1):
+        block = self.blocks[block_hash]
+        tip_height = self.blocks[self.tip]["height"]
+        block = {**block, "confirmations": tip_height - block["height"] + 1}
+        if verbosity == 2:
+            block["tx"] = [
+                self.transactions.get(txid, {"txid": txid, "vout": []})
+                for txid in block["tx"]
+            ]
+        return block
+
+    def call(self, method: str, params: list):
+        self.calls[method] += 1
+        params = params or []
+
+        if method == "getblockchaininfo":
+            return {"initialblockdownload": False}
+        if method == "getbestblockhash":
+            return self.tip
+        if method == "getblockhash":
+            return self.chain[params[0]]
+        if method == "getblock":
+            return self.getblock(*params)
+        if method == "getrawtransaction":
+            return {"txid": params[0]}
+        if method == "decoderawtransaction":
+            return {"txid": os.urandom(32).hex(), "vout": []}
+        if method == "estimatesmartfee":
+            return {"feerate": 0.0001, "blocks": params[0]}
+        if method == "createrawtransaction":
+            return "00"
+        if method == "signrawtransactionwithkey":
+            return {"hex": "01", "complete": True}
+        if method == "sendrawtransaction":
+            return os.urandom(32).hex()
+        raise KeyError(method)
+
+    def response(self, request: dict) -> dict:
+        try:
+            result = self.call(request["method"], request.get("params"))
+            error = None
+        except (KeyError, IndexError):
+            result = None
+            error = {"code": -32601, "message": "Method not found"}
+        return {"result": result, "error": error, "id": request.get("id")}
+
+    async def handle(self, request: web.Request) -> web.Response:
+        body = await request.json()
+        if isinstance(body, list):
+            return web.json_response([self.response(item) for item in body])
+        return web.json_response(self.response(body))
+
+
+class ZmqPublisher:
+    def __init__(self, endpoint: str):
+        self.context = zmq.asyncio.Context()
+        self.socket = self.context.socket(zmq.PUB)
+        self.socket.setsockopt(zmq.SNDHWM, 0)
+        self.socket.bind(endpoint)
+        self.sequence = collections.Counter()
+
+    async def publish(self, topic: bytes, body: bytes):
+        sequence = self.sequence[topic]
+        self.sequence[topic] += 1
+        await self.socket.send_multipart(
+            [topic, body, sequence.to_bytes(4, "little")])
+
+    def close(self):
+        self.socket.close()
+        self.context.term()
+
+
+class CallbackSink:
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.arrivals: dict[str, float] = {}
+        self.count = 0
+        self.event = asyncio.Event()
+        self.expected = 0
+
+    def record(self, item: dict):
+        self.count += 1
+        self.arrivals.setdefault(item["txid"], time.perf_counter())
+        if len(self.arrivals) >= self.expected:
+            self.event.set()
+
+    async def handle(self, request: web.Request) -> web.Response:
+        body = await request.json()
+        await asyncio.sleep(self.latency)
+        if isinstance(body, list):
+            for item in body:
+                self.record(item)
+            return web.json_response(
+                {"items": [{"stop": False} for _ in body]})
+        self.record(body)
+        return web.json_response({"stop": False})
+
+
+class FakeExchange:
+    def __init__(self, interval: float = 0.05):
+        self.interval = interval
+        self.prices: dict[str, tuple[str, str]] = {}
+        self.down: set[str] = set()
+        self.connections = collections.Counter()
+        self.polls = collections.Counter()
+
+    def app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_get("/binance/ws", self.binance_ws)
+        app.router.add_get("/binance/rest", self.binance_rest)
+        app.router.add_get("/coinbase/ws", self.coinbase_ws)
+        app.router.add_get("/coinbase/rest/{market}/ticker",
+                           self.coinbase_rest)
+        app.router.add_get("/kraken/ws", self.kraken_ws)
+        app.router.add_get("/kraken/rest", self.kraken_rest)
+        return app
+
+    async def stream(self, request: web.Request, source: str, message,
+                     subscribe: bool = False) -> web.WebSocketResponse:
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        self.connections[source] += 1
+        if subscribe:
+            await ws.receive_json()
+        reader = asyncio.create_task(self.drain(ws))
+        while source not in self.down and not reader.done():
+            if source in self.prices:
+                await ws.send_json(message(*self.prices[source]))
+            await asyncio.sleep(self.interval)
+        reader.cancel()
+        await ws.close()
+        return ws
+
+    async def drain(self, ws: web.WebSocketResponse):
+        async for _ in ws:
+            pass
+
+    async def binance_ws(self, request: web.Request):
+        market = request.query["streams"].split("@")[0].upper()
+        return await self.stream(request, "binance", lambda price, volume: {
+            "stream": f"{market.lower()}@ticker",
+            "data": {"s": market, "c": price, "v": volume}
+        })
+
+    async def coinbase_ws(self, request: web.Request):
+        return await self.stream(request, "coinbase", lambda price, volume: {
+            "type": "ticker", "product_id": "BTC-USD", "price": price,
+            "volume_24h": volume
+        }, subscribe=True)
+
+    async def kraken_ws(self, request: web.Request):
+        return await self.stream(request, "kraken", lambda price, volume: {
+            "channel": "ticker",
+            "data": [{"symbol": "BTC/USD", "last": float(price),
+                      "volume": float(volume)}]
+        }, subscribe=True)
+
+    async def binance_rest(self, request: web.Request) -> web.Response:
+        self.polls["binance"] += 1
+        price, volume = self.prices["binance"]
+        return web.json_response([
+            {"symbol": symbol, "lastPrice": price, "volume": volume}
+            for symbol in json.loads(request.query["symbols"])
+        ])
+
+    async def coinbase_rest(self, request: web.Request) -> web.Response:
+        self.polls["coinbase"] += 1
+        price, volume = self.prices["coinbase"]
+        return web.json_response({"price": price, "volume": volume})
+
+    async def kraken_rest(self, request: web.Request) -> web.Response:
+        self.polls["kraken"] += 1
+        price, volume = self.prices["kraken"]
+        return web.json_response({"error": [], "result": {
+            request.query["pair"]: {"c": [price, "1"], "v": [volume, volume]}
+        }})
+
+
+async def serve_app(app: web.Application, port: int) -> web.AppRunner:
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", port).start()
+    return runner
+
+
+async def serve(handler, port: int) -> web.AppRunner:
+    app = web.Application(client_max_size=64 * 1024 ** 2)
+    app.router.add_post("/{tail:.*}", handler)
+    return await serve_app(app, port)
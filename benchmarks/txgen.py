@@ -0,0 +1,33 @@
+import os
+
+from btc.encoding import address_to_script, segwit_encode
+from btc.transaction import write_varint
+
+
+def random_address(testnet: bool = False) -> str:
+    return segwit_encode("tb" if testnet else "bc", 0, os.urandom(20))
+
+
+def make_transaction(outputs: list[tuple[str, int]], testnet: bool = False,
+                     inputs: int = 1, segwit: bool = True) -> bytes:
+    body = write_varint(inputs)
+    for _ in range(inputs):
+        body += os.urandom(32) + b"\x00\x00\x00\x00"
+        body += b"\x00" if segwit else write_varint(107) + os.urandom(107)
+        body += b"\xfd\xff\xff\xff"
+
+    body += write_varint(len(outputs))
+    for address, value in outputs:
+        script = address_to_script(address, testnet)
+        body += value.to_bytes(8, "little") + write_varint(len(script))
+        body += script
+
+    if not segwit:
+        return b"\x02\x00\x00\x00" + body + b"\x00\x00\x00\x00"
+
+    witness = b""
+    for _ in range(inputs):
+        witness += b"\x02" + b"\x48" + os.urandom(72) + b"\x21"
+        witness += os.urandom(33)
+
+    return b"\x02\x00\x00\x00\x00\x01" + body + witness + b"\x00\x00\x00\x00"
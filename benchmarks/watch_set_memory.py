@@ -0,0 +1,69 @@
+import argparse
+import asyncio
+import uuid
+
+from redis.asyncio import Redis
+
+import watch_set
+from settings import settings
+from benchmarks.txgen import random_address
+
+
+async def used_memory(redis: Redis) -> int:
+    return (await redis.info("memory"))["used_memory"]
+
+
+async def measure(redis: Redis, items: dict[str, str], bucketed: bool,
+                  chunk: int) -> float:
+    await redis.flushdb()
+    before = await used_memory(redis)
+
+    pairs = list(items.items())
+    for idx in range(0, len(pairs), chunk):
+        batch = pairs[idx:idx + chunk]
+        if bucketed:
+            await watch_set.add_many(redis, [
+                {"address": address, "order_id": order_id,
+                 "expires_at": None}
+                for address, order_id in batch
+            ])
+        else:
+            await redis.mset(dict(batch))
+
+    per_address = (await used_memory(redis) - before) / len(items)
+    await redis.flushdb()
+    return per_address
+
+
+async def run(args):
+    redis = Redis(host=settings.REDIS_HOST, db=args.db)
+    items = {
+        random_address(settings.TESTNET): str(uuid.uuid4())
+        for _ in range(args.count)
+    }
+    try:
+        keys = await measure(redis, items, False, args.chunk)
+        buckets = await measure(redis, items, True, args.chunk)
+    finally:
+        await redis.close()
+
+    print(f"addresses:       {args.count}")
+    print(f"buckets:         {settings.WATCH_BUCKETS}")
+    print(f"string keys:     {keys:.1f} bytes per address")
+    print(f"hash buckets:    {buckets:.1f} bytes per address")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Compare Redis memory per watched address for string "
+                    "keys and bucketed hashes. The selected database is "
+                    "flushed."
+    )
+    parser.add_argument("--count", type=int, default=1000000)
+    parser.add_argument("--chunk", type=int, default=5000)
+    parser.add_argument("--db", type=int, default=15)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+import hashlib
+
+
+BASE58_ALPHABET = "123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz"
+BECH32_ALPHABET = "qpzry9x8gf2tvdw0s3jn54khce6mua7l"
+BECH32_CONST = 1
+BECH32M_CONST = 0x2bc830a3
+
+MAINNET = {"hrp": "bc", "p2pkh": b"\x00", "p2sh": b"\x05"}
+TESTNET = {"hrp": "tb", "p2pkh": b"\x6f", "p2sh": b"\xc4"}
+
+
+def sha256d(data: bytes) -> bytes:
+    return hashlib.sha256(hashlib.sha256(data).digest()).digest()
+
+
+def hash160(data: bytes) -> bytes:
+    return hashlib.new("ripemd160", hashlib.sha256(data).digest()).digest()
+
+
+def base58check_encode(payload: bytes) -> str:
+    data = payload + sha256d(payload)[:4]
+    number = int.from_bytes(data, "big")
+    chars = []
+    while number:
+        number, rem = divmod(number, 58)
+        chars.append(BASE58_ALPHABET[rem])
+    pad = len(data) - len(data.lstrip(b"\x00"))
+    return "1" * pad + "".join(reversed(chars))
+
+
+def base58check_decode(string: str) -> bytes:
+    number = 0
+    for char in string:
+        number = number * 58 + BASE58_ALPHABET.index(char)
+    pad = len(string) - len(string.lstrip("1"))
+    data = b"\x00" * pad + number.to_bytes((number.bit_length() + 7) // 8,
+                                           "big")
+    payload, checksum = data[:-4], data[-4:]
+    if sha256d(payload)[:4] != checksum:
+        raise ValueError("invalid base58 checksum")
+    return payload
+
+
+def _bech32_polymod(values: list[int]) -> int:
+    generator = (0x3b6a57b2, 0x26508e6d, 0x1ea119fa, 0x3d4233dd, 0x2a1462b3)
+    chk = 1
+    for value in values:
+        top = chk >> 25
+        chk = (chk & 0x1ffffff) << 5 ^ value
+        for idx in range(5):
+            chk ^= generator[idx] if ((top >> idx) & 1) else 0
+    return chk
+
+
+def _bech32_hrp_expand(hrp: str) -> list[int]:
+    return [ord(x) >> 5 for x in hrp] + [0] + [ord(x) & 31 for x in hrp]
+
+
+def _convertbits(data: bytes | list[int], frombits: int, tobits: int,
+                 pad: bool = True) -> list[int]:
+    acc = 0
+    bits = 0
+    ret = []
+    maxv = (1 << tobits) - 1
+    for value in data:
+        acc = (acc << frombits) | value
+        bits += frombits
+        while bits >= tobits:
+            bits -= tobits
+            ret.append((acc >> bits) & maxv)
+    if pad:
+        if bits:
+            ret.append((acc << (tobits - bits)) & maxv)
+    elif bits >= frombits or ((acc << (tobits - bits)) & maxv):
+        raise ValueError("invalid padding")
+    return ret
+
+
+def segwit_encode(hrp: str, witver: int, witprog: bytes) -> str:
+    const = BECH32_CONST if witver == 0 else BECH32M_CONST
+    data = [witver] + _convertbits(witprog, 8, 5)
+    polymod = _bech32_polymod(
+        _bech32_hrp_expand(hrp) + data + [0] * 6) ^ const
+    checksum = [(polymod >> 5 * (5 - idx)) & 31 for idx in range(6)]
+    return hrp + "1" + "".join(BECH32_ALPHABET[d] for d in data + checksum)
+
+
+def segwit_decode(hrp: str, address: str) -> tuple[int, bytes]:
+    address = address.lower()
+    pos = address.rfind("1")
+    if address[:pos] != hrp:
+        raise ValueError("invalid bech32 hrp")
+    data = [BECH32_ALPHABET.index(x) for x in address[pos + 1:]]
+    witver = data[0]
+    const = BECH32_CONST if witver == 0 else BECH32M_CONST
+    if _bech32_polymod(_bech32_hrp_expand(hrp) + data) != const:
+        raise ValueError("invalid bech32 checksum")
+    return witver, bytes(_convertbits(data[1:-6], 5, 8, False))
+
+
+def script_to_address(script: bytes, testnet: bool = False) -> str | None:
+    network = TESTNET if testnet else MAINNET
+    length = len(script)
+
+    if (length == 25 and script[:3] == b"\x76\xa9\x14"
+            and script[23:] == b"\x88\xac"):
+        return base58check_encode(network["p2pkh"] + script[3:23])
+
+    if length == 23 and script[:2] == b"\xa9\x14" and script[22] == 0x87:
+        return base58check_encode(network["p2sh"] + script[2:22])
+
+    if 4 <= length <= 42 and script[1] == length - 2:
+        opcode = script[0]
+        if opcode == 0 and length in (22, 34):
+            return segwit_encode(network["hrp"], 0, script[2:])
+        if 0x51 <= opcode <= 0x60:
+            return segwit_encode(network["hrp"], opcode - 0x50, script[2:])
+
+    return None
+
+
+def address_to_script(address: str, testnet: bool = False) -> bytes:
+    network = TESTNET if testnet else MAINNET
+    if address.lower().startswith(network["hrp"] + "1"):
+        witver, witprog = segwit_decode(network["hrp"], address)
+        opcode = 0 if witver == 0 else witver + 0x50
+        return bytes([opcode, len(witprog)]) + witprog
+
+    payload = base58check_decode(address)
+    if payload[:1] == network["p2pkh"]:
+        return b"\x76\xa9\x14" + payload[1:] + b"\x88\xac"
+    if payload[:1] == network["p2sh"]:
+        return b"\xa9\x14" + payload[1:] + b"\x87"
+
+    raise ValueError(f"unsupported address {address}")
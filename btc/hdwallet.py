@@ -0,0 +1,90 @@
+import hmac
+from hashlib import sha512
+from typing import NamedTuple
+
+from cryptography.hazmat.primitives.asymmetric import ec
+
+from btc.encoding import base58check_decode, base58check_encode, \
+                         segwit_encode, hash160
+
+
+P = 2 ** 256 - 2 ** 32 - 977
+N = 0xfffffffffffffffffffffffffffffffebaaedce6af48a03bbfd25e8cd0364141
+
+
+def point_mul_g(scalar: int) -> tuple[int, int]:
+    numbers = ec.derive_private_key(
+        scalar, ec.SECP256K1()).public_key().public_numbers()
+    return numbers.x, numbers.y
+
+
+def point_add(a: tuple[int, int], b: tuple[int, int]) -> tuple[int, int]:
+    if a == b:
+        slope = 3 * a[0] * a[0] * pow(2 * a[1], -1, P) % P
+    else:
+        slope = (b[1] - a[1]) * pow(b[0] - a[0], -1, P) % P
+    x = (slope * slope - a[0] - b[0]) % P
+    return x, (slope * (a[0] - x) - a[1]) % P
+
+
+def compress(point: tuple[int, int]) -> bytes:
+    return bytes([2 + (point[1] & 1)]) + point[0].to_bytes(32, "big")
+
+
+def decompress(public_key: bytes) -> tuple[int, int]:
+    x = int.from_bytes(public_key[1:], "big")
+    y = pow((pow(x, 3, P) + 7) % P, (P + 1) // 4, P)
+    if y & 1 != public_key[0] & 1:
+        y = P - y
+    return x, y
+
+
+class ExtendedKey(NamedTuple):
+    key: bytes
+    chain_code: bytes
+
+    @classmethod
+    def parse(cls, string: str) -> "ExtendedKey":
+        payload = base58check_decode(string)
+        if len(payload) != 78:
+            raise ValueError("invalid extended key length")
+        key = payload[45:]
+        if key[0] == 0:
+            key = key[1:]
+        return cls(key, payload[13:45])
+
+    @property
+    def is_private(self) -> bool:
+        return len(self.key) == 32
+
+    @property
+    def public_key(self) -> bytes:
+        if self.is_private:
+            return compress(point_mul_g(int.from_bytes(self.key, "big")))
+        return self.key
+
+    def child(self, index: int) -> "ExtendedKey":
+        if index >= 2 ** 31:
+            raise ValueError("hardened derivation is not supported")
+
+        digest = hmac.digest(self.chain_code,
+                             self.public_key + index.to_bytes(4, "big"),
+                             sha512)
+        tweak = int.from_bytes(digest[:32], "big")
+        if tweak >= N:
+            raise ValueError("invalid child index")
+
+        if self.is_private:
+            key = (tweak + int.from_bytes(self.key, "big")) % N
+            return ExtendedKey(key.to_bytes(32, "big"), digest[32:])
+
+        point = point_add(point_mul_g(tweak), decompress(self.key))
+        return ExtendedKey(compress(point), digest[32:])
+
+    def address(self, testnet: bool = False) -> str:
+        return segwit_encode("tb" if testnet else "bc", 0,
+                             hash160(self.public_key))
+
+    def wif(self, testnet: bool = False) -> str:
+        prefix = b"\xef" if testnet else b"\x80"
+        return base58check_encode(prefix + self.key + b"\x01")
@@ -0,0 +1,86 @@
+from decimal import Decimal
+from typing import NamedTuple
+
+from btc.encoding import sha256d, script_to_address
+
+
+class TxOut(NamedTuple):
+    n: int
+    value: Decimal
+    address: str | None
+
+
+class Transaction(NamedTuple):
+    txid: str
+    vout: list[TxOut]
+
+
+def read_varint(data: bytes, pos: int) -> tuple[int, int]:
+    prefix = data[pos]
+    if prefix < 0xfd:
+        return prefix, pos + 1
+    if prefix == 0xfd:
+        return int.from_bytes(data[pos + 1:pos + 3], "little"), pos + 3
+    if prefix == 0xfe:
+        return int.from_bytes(data[pos + 1:pos + 5], "little"), pos + 5
+    return int.from_bytes(data[pos + 1:pos + 9], "little"), pos + 9
+
+
+def write_varint(number: int) -> bytes:
+    if number < 0xfd:
+        return bytes([number])
+    if number <= 0xffff:
+        return b"\xfd" + number.to_bytes(2, "little")
+    if number <= 0xffffffff:
+        return b"\xfe" + number.to_bytes(4, "little")
+    return b"\xff" + number.to_bytes(8, "little")
+
+
+def decode_transaction(raw: bytes, testnet: bool = False) -> Transaction:
+    try:
+        return _decode_transaction(raw, testnet)
+    except IndexError as exc:
+        raise ValueError("truncated transaction") from exc
+
+
+def _decode_transaction(raw: bytes, testnet: bool) -> Transaction:
+    segwit = raw[4] == 0 and raw[5] != 0
+    pos = 6 if segwit else 4
+
+    vin_count, pos = read_varint(raw, pos)
+    for _ in range(vin_count):
+        script_len, pos = read_varint(raw, pos + 36)
+        pos += script_len + 4
+
+    vout = []
+    vout_count, pos = read_varint(raw, pos)
+    for n in range(vout_count):
+        value = int.from_bytes(raw[pos:pos + 8], "little")
+        script_len, pos = read_varint(raw, pos + 8)
+        script = raw[pos:pos + script_len]
+        pos += script_len
+        vout.append(TxOut(
+            n,
+            Decimal(value).scaleb(-8),
+            script_to_address(script, testnet)
+        ))
+
+    outputs_end = pos
+    if segwit:
+        for _ in range(vin_count):
+            item_count, pos = read_varint(raw, pos)
+            for _ in range(item_count):
+                if raw[pos] < 0xfd:
+                    pos += raw[pos] + 1
+                else:
+                    item_len, pos = read_varint(raw, pos)
+                    pos += item_len
+
+    if pos + 4 != len(raw):
+        raise ValueError("unexpected transaction length")
+    if segwit:
+        stripped = raw[:4] + raw[6:outputs_end] + raw[-4:]
+    else:
+        stripped = raw
+
+    return Transaction(sha256d(stripped)[::-1].hex(), vout)
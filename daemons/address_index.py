@@ -0,0 +1,45 @@
+import math
+from hashlib import blake2b
+
+
+class BloomFilter:
+    def __init__(self, capacity: int, error_rate: float):
+        self.capacity = capacity
+        self.size = max(8, math.ceil(
+            -capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def positions(self, item: str):
+        digest = blake2b(item.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        for idx in range(self.hash_count):
+            yield (h1 + idx * h2) % self.size
+
+    def add(self, item: str):
+        for pos in self.positions(item):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+
+    def __contains__(self, item: str) -> bool:
+        return all(
+            self.bits[pos >> 3] & (1 << (pos & 7))
+            for pos in self.positions(item)
+        )
+
+
+class AddressIndex:
+    def __init__(self, capacity: int, error_rate: float):
+        self.filter = BloomFilter(capacity, error_rate)
+
+    def add(self, address: str) -> bool:
+        self.filter.add(address)
+        return self.filter.count <= self.filter.capacity
+
+    def __contains__(self, address: str) -> bool:
+        return address in self.filter
+
+    def __len__(self) -> int:
+        return self.filter.count
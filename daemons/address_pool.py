@@ -0,0 +1,67 @@
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+
+from settings import settings
+from daemons.utils import BaseDaemon
+from database.sql import Queries
+from api_server.wallet import generate_addresses, derive_addresses
+
+
+class AddressPoolDaemon(BaseDaemon):
+    def __init__(self):
+        super().__init__(need_postgres=True)
+        self.executor: ProcessPoolExecutor = None
+
+    async def refill(self):
+        async with self.get_db() as db_conn:
+            count = await db_conn.fetchval(Queries.count_unclaimed_addresses)
+            missing = settings.ADDRESS_POOL_HIGH_WATER - count
+            if count >= settings.ADDRESS_POOL_LOW_WATER:
+                return
+
+            if settings.HD_XPUB:
+                indexes = [
+                    record[0] for record in await db_conn.fetch(
+                        Queries.next_derivation_indexes, missing)
+                ]
+
+        loop = asyncio.get_running_loop()
+        chunk_size = settings.ADDRESS_POOL_CHUNK
+        if settings.HD_XPUB:
+            columns = ["address", "derivation_index"]
+            futures = [
+                loop.run_in_executor(self.executor, derive_addresses,
+                                     indexes[idx:idx + chunk_size])
+                for idx in range(0, missing, chunk_size)
+            ]
+        else:
+            columns = ["address", "priv_key"]
+            futures = [
+                loop.run_in_executor(self.executor, generate_addresses,
+                                     min(chunk_size, missing - idx))
+                for idx in range(0, missing, chunk_size)
+            ]
+
+        for future in asyncio.as_completed(futures):
+            records = await future
+            async with self.get_db() as db_conn:
+                await db_conn.copy_records_to_table(
+                    "addresses",
+                    records=records,
+                    columns=columns
+                )
+
+    async def handler(self):
+        self.executor = ProcessPoolExecutor(settings.ADDRESS_POOL_WORKERS)
+
+        try:
+            while True:
+                await self.refill()
+                await asyncio.sleep(settings.ADDRESS_POOL_INTERVAL)
+        except asyncio.CancelledError:
+            self.executor.shutdown(cancel_futures=True)
+
+
+if __name__ == "__main__":
+    daemon = AddressPoolDaemon()
+    daemon.start()
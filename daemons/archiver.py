@@ -0,0 +1,45 @@
+import asyncio
+
+import redis.asyncio as redis
+
+import watch_set
+from settings import settings
+from daemons.utils import BaseDaemon
+from database.sql import Queries
+from api_server.cache import invalidate
+
+
+class ArchiverDaemon(BaseDaemon):
+    def __init__(self):
+        super().__init__(need_postgres=True, need_redis=True)
+        self.cache_conn: redis.Redis = None
+
+    async def archive_batch(self) -> int:
+        async with self.get_db() as db_conn:
+            async with db_conn.transaction():
+                rows = await db_conn.fetch(Queries.archive_addresses,
+                                           settings.ARCHIVE_BATCH)
+        if rows:
+            await watch_set.remove_many(self.cache_conn, rows)
+            await invalidate(self.cache_conn, settings.ADDRESS_CACHE_CHANNEL, [
+                key for row in rows
+                for key in (f"address:{row['address']}",
+                            f"order:{row['order_id']}")
+            ])
+        return len(rows)
+
+    async def handler(self):
+        self.cache_conn = redis.Redis(host=settings.REDIS_HOST)
+
+        try:
+            while True:
+                while await self.archive_batch() == settings.ARCHIVE_BATCH:
+                    pass
+                await asyncio.sleep(settings.ARCHIVE_INTERVAL)
+        except asyncio.CancelledError:
+            await self.cache_conn.close()
+
+
+if __name__ == "__main__":
+    daemon = ArchiverDaemon()
+    daemon.start()
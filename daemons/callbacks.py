@@ -0,0 +1,131 @@
+import time
+import random
+import asyncio
+from urllib.parse import urlsplit
+
+import aiohttp
+import asyncpg
+
+from settings import settings
+from daemons.utils import BaseDaemon
+from database.sql import Queries
+from metrics import CALLBACK_LATENCY, CALLBACK_REQUESTS, CALLBACK_DEAD
+
+
+class CallbackDaemon(BaseDaemon):
+    def __init__(self):
+        super().__init__(need_postgres=True)
+        self.session: aiohttp.ClientSession = None
+
+    @staticmethod
+    def parse_stop_ids(callback: asyncpg.Record,
+                       response_json: dict) -> list[int]:
+        if callback["payment_ids"] is None:
+            if response_json["stop"] is True:
+                return [callback["payment_id"]]
+            return []
+
+        return [
+            payment_id
+            for payment_id, item in zip(callback["payment_ids"],
+                                        response_json["items"])
+            if item["stop"] is True
+        ]
+
+    async def send_callback(self, callback: asyncpg.Record):
+        target = urlsplit(callback["url"]).netloc
+        status = "error"
+        error = None
+        stop_ids = []
+
+        started = time.perf_counter()
+        try:
+            async with self.session.post(
+                callback["url"],
+                data=callback["payload"]
+            ) as response:
+                status = response.status
+                if status >= 300:
+                    error = f"http status {status}"
+                else:
+                    try:
+                        response_json = await response.json(content_type=None)
+                        stop_ids = self.parse_stop_ids(callback,
+                                                       response_json)
+                    except Exception:
+                        pass
+        except Exception as exc:
+            error = repr(exc)
+
+        CALLBACK_LATENCY.labels(target).observe(time.perf_counter() - started)
+        CALLBACK_REQUESTS.labels(target, status).inc()
+
+        if error:
+            await self.retry_callback(callback, target, error)
+            return
+
+        async with self.get_db() as db_conn:
+            async with db_conn.transaction():
+                if stop_ids:
+                    await db_conn.execute(Queries.update_is_cb_active_many,
+                                          stop_ids)
+                result = await db_conn.execute(Queries.delete_sent_callback,
+                                               callback["id"],
+                                               callback["payload"])
+                if result == "DELETE 0":
+                    await db_conn.execute(Queries.release_callback,
+                                          callback["id"])
+
+    async def retry_callback(self, callback: asyncpg.Record, target: str,
+                             error: str):
+        delay = min(
+            settings.CALLBACK_BACKOFF_MAX,
+            settings.CALLBACK_BACKOFF_BASE * 2 ** callback["attempts"]
+        ) * random.uniform(0.5, 1)
+
+        async with self.get_db() as db_conn:
+            status = await db_conn.fetchval(
+                Queries.retry_callback,
+                callback["id"], error, delay, settings.CALLBACK_MAX_ATTEMPTS
+            )
+        if status == "dead":
+            CALLBACK_DEAD.labels(target).inc()
+
+    async def handler(self):
+        self.session = aiohttp.ClientSession(
+            headers={"content-type": "application/json"},
+            timeout=aiohttp.ClientTimeout(total=settings.CALLBACK_TIMEOUT),
+            connector=aiohttp.TCPConnector(
+                limit=settings.CALLBACK_CONCURRENCY,
+                limit_per_host=settings.CALLBACK_CONCURRENCY_PER_HOST,
+                keepalive_timeout=60
+            )
+        )
+
+        try:
+            while True:
+                free_slots = settings.CALLBACK_CONCURRENCY - len(self.tasks)
+                if free_slots <= 0:
+                    await asyncio.wait(self.tasks,
+                                       return_when=asyncio.FIRST_COMPLETED)
+                    continue
+
+                async with self.get_db() as db_conn:
+                    callbacks = await db_conn.fetch(
+                        Queries.claim_callbacks,
+                        free_slots, settings.CALLBACK_LEASE
+                    )
+
+                for callback in callbacks:
+                    self.add_task(self.send_callback(callback))
+
+                if not callbacks:
+                    await asyncio.sleep(settings.CALLBACK_POLL_INTERVAL)
+
+        except asyncio.CancelledError:
+            await self.session.close()
+
+
+if __name__ == "__main__":
+    daemon = CallbackDaemon()
+    daemon.start()
@@ -1,45 +1,82 @@
+import json
+import time
 import asyncio
+from decimal import Decimal
 
 import aiohttp
 import redis.asyncio as redis
 
 from settings import settings
-from daemons.utils import BaseDaemon, base_retry
+from daemons.utils import BaseDaemon
+from daemons.feeds import FEEDS, RateAggregator, Tick
 
 
-class BinanceDaemon(BaseDaemon):
+class ExchangeRateDaemon(BaseDaemon):
     def __init__(self):
         super().__init__(need_redis=True)
-        self.url = "https://api.binance.us/api/v3/ticker/price"
-        self.params = {"symbol": "BTCUSD"}
+        self.feeds = [
+            FEEDS[name](settings.RATE_SYMBOLS)
+            for name in settings.RATE_SOURCES
+        ]
+        self.aggregator = RateAggregator(settings.RATE_AGGREGATION,
+                                         settings.RATE_SOURCE_MAX_AGE)
+        self.published: dict[str, Decimal] = {}
         self.cache_conn: redis.Redis = None
-        self.binance_session: aiohttp.ClientSession = None
-
-    @base_retry
-    async def fetch_rate(self):
-        async with self.binance_session.get(
-            self.url, params=self.params
-        ) as resp:
-            if resp.status == 200:
-                resp_json = await resp.json()
-                await self.cache_conn.set("BTCUSD", resp_json["price"])
-            else:
-                raise Exception(f"http status {resp.status}")
+        self.session: aiohttp.ClientSession = None
+
+    async def publish_rate(self, symbol: str, price: str):
+        timestamp = time.time()
+        await self.cache_conn.pipeline(transaction=False) \
+            .mset({symbol: price, f"{symbol}:time": timestamp}) \
+            .publish(settings.RATE_CHANNEL, json.dumps({
+                "symbol": symbol,
+                "price": price,
+                "time": timestamp
+            })) \
+            .execute()
+
+    async def update_rate(self, symbol: str, force: bool = False):
+        rate = self.aggregator.rate(symbol)
+        if rate is None:
+            return
+
+        published = self.published.get(symbol)
+        if (not force and published
+                and abs(rate - published) / published
+                < settings.RATE_THRESHOLD):
+            return
+
+        self.published[symbol] = rate
+        await self.publish_rate(symbol,
+                                str(rate.quantize(Decimal("0.01"))))
+
+    async def on_tick(self, tick: Tick):
+        self.aggregator.add(tick)
+        await self.update_rate(tick.symbol)
+
+    async def heartbeat_worker(self):
+        while True:
+            await asyncio.sleep(settings.RATE_HEARTBEAT)
+            for symbol in settings.RATE_SYMBOLS:
+                await self.update_rate(symbol, force=True)
 
     async def handler(self):
         self.cache_conn = redis.Redis(host=settings.REDIS_HOST)
-        self.binance_session = aiohttp.ClientSession(
+        self.session = aiohttp.ClientSession(
             timeout=aiohttp.ClientTimeout(total=15)
         )
 
         try:
-            while True:
-                await self.fetch_rate()
-                await asyncio.sleep(10)
+            await asyncio.gather(
+                self.heartbeat_worker(),
+                *(feed.run(self.session, self.on_tick)
+                  for feed in self.feeds)
+            )
         except asyncio.CancelledError:
+            await self.session.close()
             await self.cache_conn.close()
 
 
 if __name__ == "__main__":
-    daemon = BinanceDaemon()
+    daemon = ExchangeRateDaemon()
     daemon.start()
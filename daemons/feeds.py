@@ -0,0 +1,228 @@
+import json
+import time
+import asyncio
+import logging
+import statistics
+from decimal import Decimal
+from typing import Awaitable, Callable, NamedTuple
+
+import aiohttp
+
+from settings import settings
+from metrics import RATE_TICKS
+
+
+class Tick(NamedTuple):
+    source: str
+    symbol: str
+    price: Decimal
+    volume: Decimal
+    time: float
+
+
+OnTick = Callable[[Tick], Awaitable[None]]
+
+
+class Feed:
+    name: str
+    ws_url: str = None
+    rest_url: str = None
+
+    def __init__(self, symbols: list[str], ws_url: str = None,
+                 rest_url: str = None):
+        self.symbols = {self.market(symbol): symbol for symbol in symbols}
+        self.ws_url = ws_url or self.ws_url
+        self.rest_url = rest_url or self.rest_url
+
+    def market(self, symbol: str) -> str:
+        return symbol
+
+    def tick(self, market: str, price, volume) -> Tick | None:
+        symbol = self.symbols.get(market)
+        if symbol is None:
+            return None
+        return Tick(self.name, symbol, Decimal(price), Decimal(volume),
+                    time.time())
+
+    def stream_url(self) -> str:
+        return self.ws_url
+
+    async def subscribe(self, ws: aiohttp.ClientWebSocketResponse):
+        pass
+
+    def parse(self, message) -> list[Tick]:
+        return []
+
+    async def poll(self, session: aiohttp.ClientSession) -> list[Tick]:
+        return []
+
+    async def stream(self, session: aiohttp.ClientSession, on_tick: OnTick):
+        async with session.ws_connect(self.stream_url(),
+                                      heartbeat=30) as ws:
+            await self.subscribe(ws)
+            while True:
+                msg = await ws.receive(timeout=settings.RATE_STREAM_TIMEOUT)
+                if msg.type != aiohttp.WSMsgType.TEXT:
+                    raise Exception(f"websocket closed: {msg.type}")
+                for tick in self.parse(json.loads(msg.data)):
+                    await on_tick(tick)
+
+    async def run(self, session: aiohttp.ClientSession, on_tick: OnTick):
+        while True:
+            try:
+                await self.stream(session, on_tick)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logging.exception(f"{self.name} stream failed")
+
+            if not self.rest_url:
+                await asyncio.sleep(settings.RATE_RECONNECT_DELAY)
+                continue
+
+            deadline = time.monotonic() + settings.RATE_RECONNECT_DELAY
+            while time.monotonic() < deadline:
+                try:
+                    for tick in await self.poll(session):
+                        RATE_TICKS.labels(self.name, "rest").inc()
+                        await on_tick(tick)
+                except asyncio.CancelledError:
+                    raise
+                except Exception:
+                    logging.exception(f"{self.name} poll failed")
+                await asyncio.sleep(settings.RATE_REST_INTERVAL)
+
+
+class BinanceFeed(Feed):
+    name = "binance"
+    ws_url = "wss://stream.binance.us:9443/stream"
+    rest_url = "https://api.binance.us/api/v3/ticker/24hr"
+
+    def stream_url(self) -> str:
+        streams = "/".join(f"{market.lower()}@ticker"
+                           for market in self.symbols)
+        return f"{self.ws_url}?streams={streams}"
+
+    def parse(self, message) -> list[Tick]:
+        data = message.get("data", {})
+        tick = self.tick(data.get("s"), data.get("c", 0), data.get("v", 0))
+        if tick is None:
+            return []
+        RATE_TICKS.labels(self.name, "ws").inc()
+        return [tick]
+
+    async def poll(self, session: aiohttp.ClientSession) -> list[Tick]:
+        async with session.get(self.rest_url, params={
+            "symbols": json.dumps(list(self.symbols), separators=(",", ":"))
+        }) as resp:
+            resp.raise_for_status()
+            items = await resp.json()
+        ticks = [self.tick(item["symbol"], item["lastPrice"], item["volume"])
+                 for item in items]
+        return [tick for tick in ticks if tick]
+
+
+class CoinbaseFeed(Feed):
+    name = "coinbase"
+    ws_url = "wss://ws-feed.exchange.coinbase.com"
+    rest_url = "https://api.exchange.coinbase.com/products"
+
+    def market(self, symbol: str) -> str:
+        return f"{symbol[:3]}-{symbol[3:]}"
+
+    async def subscribe(self, ws: aiohttp.ClientWebSocketResponse):
+        await ws.send_json({
+            "type": "subscribe",
+            "product_ids": list(self.symbols),
+            "channels": ["ticker"]
+        })
+
+    def parse(self, message) -> list[Tick]:
+        if message.get("type") != "ticker":
+            return []
+        tick = self.tick(message.get("product_id"), message["price"],
+                         message.get("volume_24h", 0))
+        if tick is None:
+            return []
+        RATE_TICKS.labels(self.name, "ws").inc()
+        return [tick]
+
+    async def poll(self, session: aiohttp.ClientSession) -> list[Tick]:
+        ticks = []
+        for market in self.symbols:
+            async with session.get(
+                f"{self.rest_url}/{market}/ticker"
+            ) as resp:
+                resp.raise_for_status()
+                item = await resp.json()
+            ticks.append(self.tick(market, item["price"], item["volume"]))
+        return ticks
+
+
+class KrakenFeed(Feed):
+    name = "kraken"
+    ws_url = "wss://ws.kraken.com/v2"
+    rest_url = "https://api.kraken.com/0/public/Ticker"
+
+    def market(self, symbol: str) -> str:
+        return f"{symbol[:3]}/{symbol[3:]}"
+
+    async def subscribe(self, ws: aiohttp.ClientWebSocketResponse):
+        await ws.send_json({
+            "method": "subscribe",
+            "params": {"channel": "ticker", "symbol": list(self.symbols)}
+        })
+
+    def parse(self, message) -> list[Tick]:
+        if message.get("channel") != "ticker":
+            return []
+        ticks = []
+        for item in message.get("data", []):
+            tick = self.tick(item["symbol"], item["last"], item["volume"])
+            if tick:
+                RATE_TICKS.labels(self.name, "ws").inc()
+                ticks.append(tick)
+        return ticks
+
+    async def poll(self, session: aiohttp.ClientSession) -> list[Tick]:
+        ticks = []
+        for market in self.symbols:
+            async with session.get(self.rest_url, params={
+                "pair": market.replace("/", "")
+            }) as resp:
+                resp.raise_for_status()
+                data = await resp.json()
+            if data.get("error"):
+                raise Exception(f"kraken error {data['error']}")
+            for item in data["result"].values():
+                ticks.append(self.tick(market, item["c"][0], item["v"][1]))
+        return ticks
+
+
+FEEDS: dict[str, type[Feed]] = {
+    feed.name: feed for feed in (BinanceFeed, CoinbaseFeed, KrakenFeed)
+}
+
+
+class RateAggregator:
+    def __init__(self, method: str, max_age: float):
+        self.method = method
+        self.max_age = max_age
+        self.ticks: dict[str, dict[str, Tick]] = {}
+
+    def add(self, tick: Tick):
+        self.ticks.setdefault(tick.symbol, {})[tick.source] = tick
+
+    def rate(self, symbol: str) -> Decimal | None:
+        now = time.time()
+        ticks = [
+            tick for tick in self.ticks.get(symbol, {}).values()
+            if now - tick.time <= self.max_age
+        ]
+        if not ticks:
+            return None
+
+        volume = sum(tick.volume for tick in ticks)
+        if self.method == "vwap" and volume:
+            return sum(tick.price * tick.volume for tick in ticks) / volume
+        return statistics.median(tick.price for tick in ticks)
@@ -0,0 +1,49 @@
+import time
+import asyncio
+import logging
+from typing import Awaitable, Callable
+
+from metrics import FEE_CACHE_REQUESTS
+
+
+class FeeRateCache:
+    def __init__(self, fetch: Callable[[], Awaitable[float | None]],
+                 max_age: float, fallback: float):
+        self.fetch = fetch
+        self.max_age = max_age
+        self.fallback = fallback
+        self.feerate: float = None
+        self.updated = 0.0
+        self.lock = asyncio.Lock()
+
+    @property
+    def is_fresh(self) -> bool:
+        return (self.feerate is not None
+                and time.monotonic() - self.updated < self.max_age)
+
+    async def refresh(self):
+        try:
+            feerate = await self.fetch()
+        except Exception:
+            logging.exception("Fee rate refresh failed")
+            return
+
+        if feerate:
+            self.feerate = feerate
+            self.updated = time.monotonic()
+
+    async def get(self) -> float:
+        if self.is_fresh:
+            FEE_CACHE_REQUESTS.labels("hit").inc()
+            return self.feerate
+
+        async with self.lock:
+            if not self.is_fresh:
+                FEE_CACHE_REQUESTS.labels("miss").inc()
+                await self.refresh()
+
+        if self.is_fresh:
+            return self.feerate
+
+        FEE_CACHE_REQUESTS.labels("fallback").inc()
+        return self.fallback
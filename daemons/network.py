@@ -1,4 +1,9 @@
+import os
+import sys
+import json
+import time
 import asyncio
+import logging
 from datetime import datetime, timezone, timedelta
 from decimal import Decimal
 from typing import Any
@@ -7,13 +12,29 @@ import zmq
 import zmq.asyncio
 import aiohttp
 import redis.asyncio as redis
+from redis.exceptions import LockError
 import asyncpg
 from tenacity import retry, stop_after_attempt, wait_fixed
 
+import watch_set
 from settings import settings
+from metrics import RPC_LATENCY, RPC_ERRORS, ZMQ_MESSAGES, BLOCK_PROCESSING, \
+                    CHECKPOINT_HEIGHT, RAW_TX_ERRORS
+from btc.transaction import decode_transaction
 from daemons.utils import BaseDaemon
+from daemons.address_index import AddressIndex
+from daemons.fees import FeeRateCache
+from daemons.stages import Stage
+from daemons.resync import BlockScanner, block_outputs
 from database.sql import Queries
-from api_server.schemas import CallbackBody
+from api_server.schemas import CallbackBody, CallbackBatch
+from api_server.wallet import get_private_key
+
+
+DUST_AMOUNT = Decimal("0.00000546")
+TX_VSIZE = 11 + 31
+INPUT_VSIZE = 68
+CHECKPOINT = "network"
 
 
 class NetworkDaemon(BaseDaemon):
@@ -21,143 +42,612 @@ class NetworkDaemon(BaseDaemon):
         super().__init__(need_postgres=True, need_redis=True, need_rpc=True)
         self.zmq_context = zmq.asyncio.Context()
         self.zmq_sock = self.zmq_context.socket(zmq.SUB)
-        self.zmq_sock.setsockopt(zmq.RCVHWM, 0)
+        self.zmq_sock.setsockopt(zmq.RCVHWM, settings.ZMQ_RCVHWM)
         self.zmq_sock.setsockopt(zmq.RCVTIMEO, 30000)
         self.zmq_sock.setsockopt_string(zmq.SUBSCRIBE, "rawtx")
         self.zmq_sock.setsockopt_string(zmq.SUBSCRIBE, "hashblock")
         self.rpc_session: aiohttp.ClientSession = None
-        self.callback_session: aiohttp.ClientSession = None
         self.rpc_semafore = asyncio.Semaphore(10)
-        self.callback_semafore = asyncio.Semaphore(10)
         self.cache_conn: redis.Redis = None
+        self.address_index: AddressIndex = None
+        self.address_index_loaded: float = None
         self.block_queue = asyncio.Queue()
+        self.tip_height: int = None
+        self.scan_height: int = None
+        self.scanner = BlockScanner(self.rpc_request, self.rpc_batch_request,
+                                    settings.RESYNC_WINDOW,
+                                    settings.RESYNC_REPORT_INTERVAL)
+        self.block_hashes: dict[int, str] = {}
+        self.block_txids: dict[int, set[str]] = {}
+        self.sweep_event = asyncio.Event()
+        self.fee_cache = FeeRateCache(self.fetch_feerate,
+                                      settings.FEE_CACHE_MAX_AGE,
+                                      settings.FEE_FALLBACK_RATE)
+        self.unswept_count = 0
+        self.is_leader = False
+        self.push_sock: zmq.asyncio.Socket = None
+        self.workers: list[asyncio.subprocess.Process] = []
+        self.stages = {
+            name: Stage(name, handler, settings.STAGE_WORKERS.get(name, 1),
+                        settings.STAGE_QUEUE_SIZE, settings.STAGE_FULL_POLICY,
+                        settings.STAGE_SPILL_DIR)
+            for name, handler in (
+                ("decode", self.raw_tx_worker),
+                ("match", self.match_worker),
+                ("persist", self.persist_worker)
+            )
+        }
 
-    async def callback_worker(self, payment: asyncpg.Record, confs: int = 0):
-        callback_body = CallbackBody(**payment, confirmations=confs)
-        payload = callback_body.json()
-
-        async with self.callback_semafore:
-            stop_flag = False
-            async with self.callback_session.post(
-                settings.CALLBACK_URL,
-                data=payload
-            ) as response:
-                try:
-                    response_json = await response.json(content_type=None)
-                    stop_flag = response_json["stop"]
-                except Exception:
-                    pass
+    @retry(stop=stop_after_attempt(3), wait=wait_fixed(1), reraise=True)
+    async def rpc_request(self, method_name: str, params: list[Any] = None):
+        async with self.rpc_semafore:
+            started = time.perf_counter()
+            try:
+                async with self.rpc_session.post(
+                    settings.RPC_PROVIDER,
+                    json={
+                        "jsonrpc": "1.0",
+                        "id": "0",
+                        "method": method_name,
+                        "params": params,
+                    },
+                ) as response:
+                    resp_json = await response.json()
+            except Exception:
+                RPC_ERRORS.labels(method_name).inc()
+                raise
+            finally:
+                RPC_LATENCY.labels(method_name).observe(
+                    time.perf_counter() - started)
 
-            if stop_flag is True:
-                db_conn = await self.get_db()
-                await db_conn.execute(
-                    Queries.update_is_cb_active,
-                    payment["id"]
-                )
-                await db_conn.close()
+            if resp_json.get("error"):
+                RPC_ERRORS.labels(method_name).inc()
+            return resp_json["result"]
 
     @retry(stop=stop_after_attempt(3), wait=wait_fixed(1), reraise=True)
-    async def rpc_request(self, method_name: str, params: list[Any] = None):
+    async def rpc_batch_chunk(self, method_name: str,
+                              params_list: list[list[Any]]):
+        label = f"batch:{method_name}"
         async with self.rpc_semafore:
-            async with self.rpc_session.post(
-                settings.RPC_PROVIDER,
-                json={
-                    "jsonrpc": "1.0",
-                    "id": "0",
-                    "method": method_name,
-                    "params": params,
-                },
-            ) as response:
-                resp_json = await response.json()
-                return resp_json["result"]
-
-    async def forward_transaction(self, payment: asyncpg.Record):
-        result = await self.rpc_request("estimatesmartfee", [5])
-        feerate = result['feerate'] if result else 0.0001
-        mining_fee = Decimal(feerate * 200 / 1024)
-        inputs = [{"txid": payment["txid"], "vout": payment["vout"]}]
-        outputs = [{settings.ADDRESS: f"{payment['amount'] - mining_fee:.8f}"}]
-
-        db_conn = await self.get_db()
-        key = await db_conn.fetchval(
-            Queries.select_priv_key,
-            payment["address"]
-        )
-        key_bytes = bytes.fromhex(key)
-        key_wif = settings.CIPHER.decrypt(key_bytes).decode(encoding="utf-8")
+            started = time.perf_counter()
+            try:
+                async with self.rpc_session.post(
+                    settings.RPC_PROVIDER,
+                    json=[
+                        {
+                            "jsonrpc": "1.0",
+                            "id": idx,
+                            "method": method_name,
+                            "params": params,
+                        }
+                        for idx, params in enumerate(params_list)
+                    ],
+                ) as response:
+                    resp_json = await response.json()
+            except Exception:
+                RPC_ERRORS.labels(label).inc()
+                raise
+            finally:
+                RPC_LATENCY.labels(label).observe(
+                    time.perf_counter() - started)
+
+            results = [None] * len(params_list)
+            for item in resp_json:
+                if item.get("error"):
+                    RPC_ERRORS.labels(method_name).inc()
+                results[item["id"]] = item["result"]
+            return results
+
+    async def rpc_batch_request(self, method_name: str,
+                                params_list: list[list[Any]],
+                                chunk_size: int = None,
+                                concurrency: int = None):
+        chunk_size = chunk_size or settings.RPC_BATCH_SIZE
+        semafore = asyncio.Semaphore(
+            concurrency or settings.RPC_BATCH_CONCURRENCY)
+
+        async def send_chunk(chunk: list[list[Any]]):
+            async with semafore:
+                return await self.rpc_batch_chunk(method_name, chunk)
+
+        chunks = await asyncio.gather(*(
+            send_chunk(params_list[idx:idx + chunk_size])
+            for idx in range(0, len(params_list), chunk_size)
+        ))
+        return [result for chunk in chunks for result in chunk]
+
+    async def fetch_feerate(self) -> float | None:
+        result = await self.rpc_request("estimatesmartfee",
+                                        [settings.FEE_CONF_TARGET])
+        return result.get("feerate") if result else None
+
+    async def sweep_transactions(self):
+        max_height = None
+        if settings.SWEEP_MIN_CONFIRMATIONS:
+            max_height = self.tip_height - settings.SWEEP_MIN_CONFIRMATIONS + 1
+
+        feerate = await self.fee_cache.get()
+        min_amount = Decimal(feerate * (TX_VSIZE + INPUT_VSIZE) / 1000) \
+            + DUST_AMOUNT
+
+        async with self.get_db() as db_conn:
+            payments = await db_conn.fetch(
+                Queries.select_unforwarded_payments,
+                settings.SWEEP_MAX_INPUTS, max_height, min_amount
+            )
+            keys = await db_conn.fetch(
+                Queries.select_priv_keys,
+                list({payment["address"] for payment in payments})
+            )
+
+        self.unswept_count = 0
+        if not payments:
+            return
+        if len(payments) == settings.SWEEP_MAX_INPUTS:
+            self.sweep_event.set()
+
+        keys_wif = {
+            key["address"]: get_private_key(key["priv_key"],
+                                            key["derivation_index"])
+            for key in keys
+        }
+        await self.sweep_batch(payments, keys_wif, feerate)
 
+    async def sweep_batch(self, payments: list[asyncpg.Record],
+                          keys_wif: dict[str, str], feerate: float):
+        vsize = TX_VSIZE + INPUT_VSIZE * len(payments)
+        mining_fee = Decimal(feerate * vsize / 1000)
+        amount = sum(payment["amount"] for payment in payments) - mining_fee
+        if amount < DUST_AMOUNT:
+            return
+
+        inputs = [
+            {"txid": payment["txid"], "vout": payment["vout"]}
+            for payment in payments
+        ]
+        outputs = [{settings.ADDRESS: f"{amount:.8f}"}]
+        keys = list({keys_wif[payment["address"]] for payment in payments})
+
+        txid = None
         tx_hex = await self.rpc_request("createrawtransaction",
                                         [inputs, outputs])
-        signed_tx = await self.rpc_request("signrawtransactionwithkey",
-                                           [tx_hex, [key_wif], None, 'ALL'])
-        txid = await self.rpc_request("sendrawtransaction",
-                                      [signed_tx["hex"]])
+        if tx_hex:
+            signed_tx = await self.rpc_request(
+                "signrawtransactionwithkey", [tx_hex, keys, None, 'ALL'])
+            if signed_tx and signed_tx.get("complete"):
+                txid = await self.rpc_request("sendrawtransaction",
+                                              [signed_tx["hex"]])
+
+        if txid:
+            async with self.get_db() as db_conn:
+                await db_conn.execute(
+                    Queries.update_forward_txid,
+                    txid, [payment["id"] for payment in payments]
+                )
+        elif len(payments) == 1:
+            logging.error("Sweep of payment %s was rejected",
+                          payments[0]["id"])
+            async with self.get_db() as db_conn:
+                await db_conn.execute(Queries.update_forward_error,
+                                      "rejected", [payments[0]["id"]])
+        else:
+            half = len(payments) // 2
+            await self.sweep_batch(payments[:half], keys_wif, feerate)
+            await self.sweep_batch(payments[half:], keys_wif, feerate)
+
+    async def check_hd_keys(self):
+        if settings.HD_XPRV:
+            return
+        async with self.get_db() as db_conn:
+            if await db_conn.fetchval(Queries.has_derived_addresses):
+                raise Exception("HD_XPRV is required to sweep payments "
+                                "to derived addresses")
 
-        await db_conn.execute(Queries.update_forward_txid, txid, payment["id"])
-        await db_conn.close()
+    async def sweep_worker(self):
+        while True:
+            try:
+                await asyncio.wait_for(self.sweep_event.wait(),
+                                       settings.SWEEP_INTERVAL or None)
+            except asyncio.TimeoutError:
+                pass
+
+            self.sweep_event.clear()
+            if self.is_leader:
+                await self.sweep_transactions()
 
     async def process_payment(self, txid: str, vout: int, amount: Decimal,
                               address: str, order_id: str):
-        db_conn = await self.get_db()
+        async with self.get_db() as db_conn:
+            try:
+                async with db_conn.transaction():
+                    payment = await db_conn.fetchrow(
+                        Queries.insert_payment,
+                        txid, vout, amount, address, order_id
+                    )
+                    block_height = self.find_block_height(txid)
+                    if block_height is not None:
+                        await db_conn.execute(
+                            Queries.update_payment_block_height,
+                            block_height, payment["id"]
+                        )
+                    await self.insert_callbacks(db_conn, [(
+                        payment["id"],
+                        CallbackBody(**payment, confirmations=0)
+                    )])
+            except asyncpg.exceptions.UniqueViolationError:
+                return
+            except asyncpg.exceptions.ForeignKeyViolationError:
+                logging.warning("Skipping payment %s:%s, address %s was "
+                                "archived", txid, vout, address)
+                return
+
+        self.unswept_count += 1
+        if self.unswept_count >= settings.SWEEP_MAX_INPUTS:
+            self.sweep_event.set()
+
+    async def raw_tx_worker(self, body: bytes):
         try:
-            payment = await db_conn.fetchrow(
-                Queries.insert_payment,
-                txid, vout, amount, address, order_id
+            tx = decode_transaction(body, settings.TESTNET)
+        except ValueError as exc:
+            RAW_TX_ERRORS.inc()
+            logging.warning("Skipping undecodable raw transaction: %s", exc)
+            return
+        for vout in tx.vout:
+            if vout.address and vout.address in self.address_index:
+                await self.stages["match"].put((tx.txid, vout),
+                                               sheddable=True)
+
+    async def match_worker(self, item: tuple):
+        txid, vout = item
+        order_id_bytes = await watch_set.get(self.cache_conn, vout.address)
+        if order_id_bytes:
+            await self.stages["persist"].put((
+                txid,
+                vout.n,
+                vout.value,
+                vout.address,
+                order_id_bytes.decode()
+            ))
+
+    async def persist_worker(self, item: tuple):
+        await self.process_payment(*item)
+
+    def start_stages(self):
+        for stage in self.stages.values():
+            stage.start(self.add_task)
+
+    async def load_address_index(self):
+        async with self.get_db() as db_conn:
+            async with db_conn.transaction():
+                count = await db_conn.fetchval(
+                    Queries.count_watched_addresses)
+                address_index = AddressIndex(
+                    max(count * 2, settings.WATCH_FILTER_CAPACITY),
+                    settings.WATCH_FILTER_ERROR_RATE
+                )
+                async for record in db_conn.cursor(
+                    Queries.select_watched_addresses
+                ):
+                    address_index.add(record["address"])
+
+        self.address_index = address_index
+        self.address_index_loaded = time.monotonic()
+
+    async def address_index_worker(self, pubsub: redis.client.PubSub):
+        interval = settings.WATCH_FILTER_REBUILD_INTERVAL
+        while True:
+            timeout = None
+            if interval:
+                timeout = self.address_index_loaded + interval - \
+                          time.monotonic()
+                if timeout <= 0:
+                    await self.load_address_index()
+                    continue
+
+            message = await pubsub.get_message(timeout=timeout)
+            if message is None or message["type"] != "message":
+                continue
+
+            if not self.address_index.add(message["data"].decode()):
+                await self.load_address_index()
+
+    def find_block_height(self, txid: str) -> int | None:
+        for height, txids in self.block_txids.items():
+            if txid in txids:
+                return height
+
+    async def init_chain_state(self):
+        block_hash = await self.rpc_request("getbestblockhash")
+        block = await self.rpc_request("getblock", [block_hash, 1])
+        self.tip_height = block["height"]
+        self.block_hashes[block["height"]] = block["hash"]
+        await self.load_checkpoint()
+
+        async with self.get_db() as db_conn:
+            payments = await db_conn.fetch(
+                Queries.select_unconfirmed_payments)
+        txs_data = await self.rpc_batch_request(
+            "getrawtransaction",
+            [[payment["txid"], True] for payment in payments]
+        )
+
+        block_heights = []
+        for payment, tx_data in zip(payments, txs_data):
+            confs = tx_data.get("confirmations", None) if tx_data else None
+            if confs:
+                block_heights.append(
+                    (self.tip_height - confs + 1, payment["id"]))
+
+        async with self.get_db() as db_conn:
+            await db_conn.executemany(
+                Queries.update_payment_block_height,
+                block_heights
             )
-            self.add_task(self.callback_worker(payment))
-            self.add_task(self.forward_transaction(payment))
-        except asyncpg.exceptions.UniqueViolationError:
-            pass
 
-        await db_conn.close()
+    async def load_checkpoint(self):
+        async with self.get_db() as db_conn:
+            checkpoint = await db_conn.fetchrow(Queries.select_checkpoint,
+                                                CHECKPOINT)
+        if checkpoint is None:
+            await self.save_checkpoint(self.tip_height,
+                                       self.block_hashes[self.tip_height])
+            return
 
-    async def raw_tx_worker(self, body: bytes):
-        tx_data = await self.rpc_request("decoderawtransaction", [body.hex()])
-        for vout in tx_data["vout"]:
-            script_pub_key = vout.get("scriptPubKey")
-            if script_pub_key:
-                address = script_pub_key.get("address")
-                if address:
-                    order_id_bytes = await self.cache_conn.get(address)
-                    if order_id_bytes:
-                        await self.process_payment(
-                            tx_data["txid"],
-                            int(vout["n"]),
-                            Decimal(f"{vout['value']:.8f}"),
-                            address,
-                            order_id_bytes.decode()
-                        )
+        height = await self.find_fork_height(checkpoint["height"],
+                                             checkpoint["block_hash"])
+        if height < checkpoint["height"]:
+            logging.warning("Checkpoint block %s is not in the best chain, "
+                            "rescanning from block %s",
+                            checkpoint["block_hash"], height + 1)
+            async with self.get_db() as db_conn:
+                await db_conn.execute(Queries.reset_block_height, height)
+        self.scan_height = height
+        CHECKPOINT_HEIGHT.set(height)
+
+    async def find_fork_height(self, height: int, block_hash: str) -> int:
+        if height <= self.tip_height and block_hash == \
+                await self.rpc_request("getblockhash", [height]):
+            return height
+
+        while block_hash is not None:
+            block = await self.rpc_request("getblock", [block_hash, 1])
+            if block is None:
+                break
+            if block["confirmations"] >= 0:
+                return block["height"]
+            block_hash = block.get("previousblockhash")
+        return max(0, height - settings.REORG_DEPTH)
+
+    async def save_checkpoint(self, height: int, block_hash: str):
+        async with self.get_db() as db_conn:
+            await db_conn.execute(Queries.update_checkpoint,
+                                  CHECKPOINT, height, block_hash)
+        self.scan_height = height
+        CHECKPOINT_HEIGHT.set(height)
+
+    async def scan_block(self, block: dict) -> int:
+        outputs = block_outputs(block, self.address_index)
+        payments = []
+        if outputs:
+            txids, vouts, amounts, addresses = map(list, zip(*outputs))
+            confs = self.tip_height - block["height"] + 1
+            async with self.get_db() as db_conn:
+                async with db_conn.transaction():
+                    payments = await db_conn.fetch(
+                        Queries.insert_block_payments,
+                        txids, vouts, amounts, addresses, block["height"],
+                        float(block["time"])
+                    )
+                    if payments:
+                        await self.insert_callbacks(db_conn, [
+                            (payment["id"],
+                             CallbackBody(**payment, confirmations=confs))
+                            for payment in payments
+                        ])
+
+        await self.save_checkpoint(block["height"], block["hash"])
+        if payments:
+            self.unswept_count += len(payments)
+            if self.unswept_count >= settings.SWEEP_MAX_INPUTS:
+                self.sweep_event.set()
+        return len(payments)
+
+    async def resync(self, blocks: list[dict] = ()):
+        if self.scan_height >= self.tip_height:
+            return
+        if blocks and blocks[0]["height"] <= self.scan_height + 1:
+            for block in blocks:
+                if block["height"] > self.scan_height:
+                    await self.scan_block(block)
+        else:
+            await self.scanner.scan(self.scan_height + 1, self.tip_height,
+                                    self.scan_block)
+
+    async def catch_up(self):
+        block_hash = await self.rpc_request("getbestblockhash")
+        if block_hash in self.block_hashes.values():
+            await self.resync()
+        else:
+            with BLOCK_PROCESSING.time():
+                await self.process_block(bytes.fromhex(block_hash))
+
+    async def connect_blocks(self, block_hash: str) -> list[dict]:
+        if block_hash in self.block_hashes.values():
+            return []
+
+        blocks = [await self.rpc_request("getblock", [block_hash, 2])]
+        if blocks[0]["confirmations"] < 0:
+            return []
+
+        lowest_height = min(self.block_hashes, default=blocks[0]["height"])
+        while True:
+            prev_height = blocks[-1]["height"] - 1
+            prev_hash = blocks[-1].get("previousblockhash")
+            if (prev_height < lowest_height or prev_hash is None
+                    or self.block_hashes.get(prev_height) == prev_hash):
+                break
+            blocks.append(await self.rpc_request("getblock", [prev_hash, 2]))
+
+        async with self.get_db() as db_conn:
+            async with db_conn.transaction():
+                fork_height = blocks[-1]["height"] - 1
+                if fork_height < self.tip_height:
+                    await db_conn.execute(Queries.reset_block_height,
+                                          fork_height)
+                    if fork_height < self.scan_height:
+                        self.scan_height = fork_height
+                    for height in list(self.block_hashes):
+                        if height > fork_height:
+                            del self.block_hashes[height]
+                            self.block_txids.pop(height, None)
+
+                for block in reversed(blocks):
+                    txids = [tx["txid"] for tx in block["tx"]]
+                    self.block_hashes[block["height"]] = block["hash"]
+                    self.block_txids[block["height"]] = set(txids)
+                    await db_conn.execute(
+                        Queries.update_block_height,
+                        block["height"], txids
+                    )
+
+        self.tip_height = blocks[0]["height"]
+        for height in list(self.block_hashes):
+            if height <= self.tip_height - settings.REORG_DEPTH:
+                del self.block_hashes[height]
+        for height in list(self.block_txids):
+            if height <= self.tip_height - 2:
+                del self.block_txids[height]
+        return list(reversed(blocks))
+
+    async def leader_worker(self):
+        lock = self.cache_conn.lock(settings.LEADER_LOCK_KEY,
+                                    timeout=settings.LEADER_LOCK_TTL)
+        while True:
+            if self.is_leader:
+                try:
+                    await lock.reacquire()
+                except LockError:
+                    logging.error("Leader lock lost")
+                    self.is_leader = False
+            elif await lock.acquire(blocking=False):
+                self.block_hashes.clear()
+                self.block_txids.clear()
+                await self.init_chain_state()
+                self.is_leader = True
+                self.block_queue.put_nowait(None)
+
+            await asyncio.sleep(settings.LEADER_LOCK_TTL / 3)
 
     async def hash_block_worker(self):
         while True:
-            await self.block_queue.get()
-            dt_expire = datetime.now(tz=timezone.utc) - timedelta(days=14)
-            expired_payments = []
-            callback_tasks = []
+            block_hash = await self.block_queue.get()
+            if not self.is_leader:
+                continue
+            if block_hash is None:
+                await self.catch_up()
+                continue
+            with BLOCK_PROCESSING.time():
+                await self.process_block(block_hash)
+
+    async def process_block(self, block_hash: bytes):
+        blocks = await self.connect_blocks(block_hash.hex())
+        await self.resync(blocks)
+        async with self.get_db() as db_conn:
+            unconfirmed = await db_conn.fetch(
+                Queries.select_unconfirmed_payments)
+            block_heights = [
+                (block_height, payment["id"])
+                for payment in unconfirmed
+                if (block_height := self.find_block_height(
+                    payment["txid"])) is not None
+            ]
+            await db_conn.executemany(Queries.update_payment_block_height,
+                                      block_heights)
+        if settings.FEE_CACHE_MAX_AGE:
+            await self.fee_cache.refresh()
+        if settings.SWEEP_ON_BLOCK:
+            self.sweep_event.set()
+
+        dt_expire = datetime.now(tz=timezone.utc) - timedelta(days=14)
+        expired_payments = []
+        callbacks = []
 
-            db_conn = await self.get_db()
+        async with self.get_db() as db_conn:
             payments = await db_conn.fetch(Queries.select_active_payments)
 
-            for payment in payments:
-                if payment["dt_created"] < dt_expire:
-                    expired_payments.append((payment["id"], ))
-                    continue
+        for payment in payments:
+            if payment["dt_created"] < dt_expire:
+                expired_payments.append((payment["id"], ))
+            elif payment["block_height"] is not None:
+                confs = self.tip_height - payment["block_height"] + 1
+                callbacks.append((payment["id"], CallbackBody(
+                    **payment, confirmations=confs)))
+
+        async with self.get_db() as db_conn:
+            async with db_conn.transaction():
+                await db_conn.executemany(
+                    Queries.update_is_cb_active,
+                    expired_payments
+                )
+                if settings.CALLBACK_BATCH:
+                    pending = await db_conn.fetch(
+                        Queries.delete_pending_batch_callbacks,
+                        settings.CALLBACK_URL
+                    )
+                    expired = {payment_id for payment_id, in expired_payments}
+                    callbacks = self.merge_batches(pending, callbacks, {
+                        payment["id"] for payment in payments
+                        if payment["id"] not in expired
+                    })
+                if callbacks:
+                    await self.insert_callbacks(db_conn, callbacks)
 
-                tx_data = await self.rpc_request("getrawtransaction",
-                                                 [payment["txid"], True])
-                confs = tx_data.get("confirmations", None)
-                if confs:
-                    callback_tasks.append(asyncio.create_task(
-                        self.callback_worker(payment, confs)))
+    @staticmethod
+    def merge_batches(pending: list[asyncpg.Record],
+                      callbacks: list[tuple[int, CallbackBody]],
+                      active: set[int]) -> list[tuple[int, CallbackBody]]:
+        merged = {}
+        for row in sorted(pending, key=lambda row: row["id"]):
+            for payment_id, item in zip(row["payment_ids"],
+                                        json.loads(row["payload"])):
+                if payment_id in active:
+                    merged[payment_id] = CallbackBody(**item)
+        merged.update(callbacks)
+        return list(merged.items())
 
-            await db_conn.executemany(
-                Queries.update_is_cb_active,
-                expired_payments
+    @staticmethod
+    async def insert_callbacks(db_conn: asyncpg.Connection,
+                               callbacks: list[tuple[int, CallbackBody]]):
+        if settings.CALLBACK_BATCH:
+            await db_conn.execute(
+                Queries.insert_batch_callback,
+                [payment_id for payment_id, _ in callbacks],
+                settings.CALLBACK_URL,
+                CallbackBatch(__root__=[body for _, body in callbacks]).json()
             )
-            await db_conn.close()
+        else:
+            await db_conn.executemany(Queries.insert_callback, [
+                (payment_id, settings.CALLBACK_URL, body.json())
+                for payment_id, body in callbacks
+            ])
+
+    async def worker_process(self, idx: int):
+        env = {**os.environ, "NETWORK_WORKER_PARENT": str(os.getpid())}
+        if settings.METRICS_PORT:
+            env["METRICS_PORT"] = str(settings.METRICS_PORT + idx + 1)
+        env["STAGE_SPILL_DIR"] = os.path.join(settings.STAGE_SPILL_DIR,
+                                              f"worker-{idx}")
+        process = await asyncio.create_subprocess_exec(
+            sys.executable, "-m", "daemons.rawtx_worker", env=env)
+        self.workers.append(process)
+        returncode = await process.wait()
+        raise Exception(f"rawtx worker exited with {returncode}")
 
-            if callback_tasks:
-                await asyncio.wait(callback_tasks)
+    async def start_workers(self):
+        self.push_sock = self.zmq_context.socket(zmq.PUSH)
+        self.push_sock.bind(settings.NETWORK_WORKER_ENDPOINT)
+        for idx in range(settings.NETWORK_WORKERS):
+            self.add_task(self.worker_process(idx))
 
     async def handler(self):
         self.zmq_sock.connect(settings.ZMQ_SOCKET)
@@ -165,12 +655,20 @@ class NetworkDaemon(BaseDaemon):
             timeout=aiohttp.ClientTimeout(total=15),
             auth=aiohttp.BasicAuth(settings.RPC_USER, settings.RPC_PASSWORD),
         )
-        self.callback_session = aiohttp.ClientSession(
-            headers={"content-type": "application/json"},
-            timeout=aiohttp.ClientTimeout(total=15),
-        )
         self.cache_conn = redis.Redis(host=settings.REDIS_HOST)
+        await self.check_hd_keys()
+
+        pubsub = self.cache_conn.pubsub()
+        await pubsub.subscribe(settings.WATCH_CHANNEL)
+        await self.load_address_index()
+        self.add_task(self.address_index_worker(pubsub))
+        if settings.NETWORK_WORKERS:
+            await self.start_workers()
+        else:
+            self.start_stages()
+        self.add_task(self.leader_worker())
         self.add_task(self.hash_block_worker())
+        self.add_task(self.sweep_worker())
 
         try:
             while True:
@@ -178,20 +676,28 @@ class NetworkDaemon(BaseDaemon):
                     topic, body, _ = await self.zmq_sock.recv_multipart()
                 except zmq.Again:
                     self.zmq_sock.connect(settings.ZMQ_SOCKET)
+                    self.block_queue.put_nowait(None)
                     continue
 
-                if topic == b"rawtx":
-                    self.add_task(self.raw_tx_worker(body))
+                ZMQ_MESSAGES.labels(topic.decode()).inc()
+                if topic == b"rawtx" and self.push_sock:
+                    await self.push_sock.send(body)
+                elif topic == b"rawtx":
+                    await self.stages["decode"].put(body, sheddable=True)
                 elif topic == b"hashblock":
                     self.block_queue.put_nowait(body)
 
         except asyncio.CancelledError:
             self.zmq_sock.close()
-            await asyncio.gather([
+            if self.push_sock:
+                self.push_sock.close()
+            for process in self.workers:
+                if process.returncode is None:
+                    process.terminate()
+            await asyncio.gather(
                 self.rpc_session.close(),
-                self.callback_session.close(),
                 self.cache_conn.close()
-            ])
+            )
 
 
 if __name__ == "__main__":
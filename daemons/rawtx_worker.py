@@ -0,0 +1,48 @@
+import os
+import asyncio
+
+import zmq
+import zmq.asyncio
+import redis.asyncio as redis
+
+from settings import settings
+from daemons.network import NetworkDaemon
+
+
+class RawTxWorker(NetworkDaemon):
+    def __init__(self):
+        super().__init__()
+        self.need_rpc = False
+        self.pull_sock = self.zmq_context.socket(zmq.PULL)
+
+    async def parent_worker(self, parent: int):
+        while os.getppid() == parent:
+            await asyncio.sleep(1)
+        raise Exception("network daemon exited")
+
+    async def handler(self):
+        if "NETWORK_WORKER_PARENT" in os.environ:
+            self.add_task(self.parent_worker(
+                int(os.environ["NETWORK_WORKER_PARENT"])))
+        self.pull_sock.connect(settings.NETWORK_WORKER_ENDPOINT)
+        self.cache_conn = redis.Redis(host=settings.REDIS_HOST)
+
+        pubsub = self.cache_conn.pubsub()
+        await pubsub.subscribe(settings.WATCH_CHANNEL)
+        await self.load_address_index()
+        self.add_task(self.address_index_worker(pubsub))
+        self.start_stages()
+
+        try:
+            while True:
+                body = await self.pull_sock.recv()
+                await self.stages["decode"].put(body, sheddable=True)
+
+        except asyncio.CancelledError:
+            self.pull_sock.close()
+            await self.cache_conn.close()
+
+
+if __name__ == "__main__":
+    daemon = RawTxWorker()
+    daemon.start()
@@ -1,42 +1,95 @@
+import time
 import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
 
 import redis.asyncio as redis
 
+import watch_set
 from settings import settings
 from daemons.utils import BaseDaemon
 from database.sql import Queries
 
 
+WATERMARK_KEY = "cache_warmer:watermark"
+LAYOUT_KEY = "cache_warmer:watch_layout"
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+
 class CacheWarmer(BaseDaemon):
     def __init__(self):
         super().__init__(need_postgres=True, need_redis=True)
-        self.cache_semafore = asyncio.Semaphore(50)
         self.cache_conn: redis.Redis = None
 
-    async def set_value(self, address: str, order_id: str):
-        async with self.cache_semafore:
-            await self.cache_conn.set(address, order_id)
+    async def get_watermark(self) -> datetime:
+        value = await self.cache_conn.get(WATERMARK_KEY)
+        if value is None:
+            return datetime.min.replace(tzinfo=timezone.utc)
+        return datetime.fromisoformat(value.decode()) - timedelta(
+            seconds=settings.CACHE_WARM_OVERLAP)
+
+    async def warm(self, since: datetime):
+        started = time.monotonic()
+        reported = started
+        count = 0
+        watermark = None
+        pending: asyncio.Task = None
+
+        async with self.get_db() as db_conn:
+            async with db_conn.transaction(isolation="repeatable_read",
+                                           readonly=True):
+                total = await db_conn.fetchval(
+                    Queries.count_addresses_since, since)
+                cursor = await db_conn.cursor(
+                    Queries.select_addresses_since, since)
+
+                while rows := await cursor.fetch(settings.CACHE_WARM_CHUNK):
+                    if pending:
+                        await pending
+                    pending = asyncio.create_task(
+                        watch_set.add_many(self.cache_conn, rows))
+                    count += len(rows)
+                    watermark = rows[-1]["dt_created"]
+
+                    now = time.monotonic()
+                    if now - reported >= settings.CACHE_WARM_REPORT_INTERVAL:
+                        reported = now
+                        logger.info(
+                            f"Cached {count}/{total} addresses, "
+                            f"{count / (now - started):.0f} per second")
+
+        if pending:
+            await pending
+        if watermark:
+            await self.cache_conn.set(WATERMARK_KEY, watermark.isoformat())
+
+        elapsed = time.monotonic() - started
+        logger.info(f"Cached {count} addresses in {elapsed:.1f} seconds, "
+                    f"{count / max(elapsed, 1e-9):.0f} per second")
 
     async def handler(self):
         self.cache_conn = redis.Redis(host=settings.REDIS_HOST)
-        db_conn = await self.get_db()
 
         try:
-            async with db_conn.transaction():
-                async for record in db_conn.cursor(
-                    Queries.select_address_order_id
-                ):
-                    self.add_task(
-                        self.set_value(record["address"], record["order_id"])
-                    )
-            if self.tasks:
-                await asyncio.wait(self.tasks)
+            since = await self.get_watermark()
+            layout = watch_set.layout()
+            rebuild = await self.cache_conn.get(LAYOUT_KEY) != layout.encode()
+            if rebuild:
+                logger.info(f"Watch set layout changed to {layout}, "
+                            f"rewriting all addresses")
+                since = datetime.min.replace(tzinfo=timezone.utc)
 
+            await self.warm(since)
+            if rebuild:
+                removed = await watch_set.prune(self.cache_conn)
+                logger.info(f"Removed {removed} entries from old buckets")
+                await self.cache_conn.set(LAYOUT_KEY, layout)
         except asyncio.CancelledError:
-            await asyncio.gather([
-                    db_conn.close(),
-                    self.cache_conn.close()
-                ])
+            pass
+        finally:
+            await self.cache_conn.close()
 
 
 if __name__ == "__main__":
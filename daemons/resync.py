@@ -0,0 +1,74 @@
+import time
+import asyncio
+import logging
+import collections
+from decimal import Decimal
+from typing import Any, AsyncIterator, Awaitable, Callable, Container
+
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+
+def block_outputs(block: dict, watched: Container[str]
+                  ) -> list[tuple[str, int, Decimal, str]]:
+    outputs = []
+    for tx in block["tx"]:
+        for vout in tx["vout"]:
+            script = vout.get("scriptPubKey", {})
+            address = script.get("address") or next(
+                iter(script.get("addresses", [])), None)
+            if address and address in watched:
+                outputs.append((tx["txid"], vout["n"],
+                                Decimal(str(vout["value"])), address))
+    return outputs
+
+
+class BlockScanner:
+    def __init__(self, rpc_request: Callable[..., Awaitable[Any]],
+                 rpc_batch_request: Callable[..., Awaitable[list]],
+                 window: int, report_interval: float):
+        self.rpc_request = rpc_request
+        self.rpc_batch_request = rpc_batch_request
+        self.window = window
+        self.report_interval = report_interval
+
+    async def blocks(self, start: int, end: int) -> AsyncIterator[dict]:
+        hashes = await self.rpc_batch_request(
+            "getblockhash", [[height] for height in range(start, end + 1)])
+        pending = collections.deque()
+        try:
+            for block_hash in hashes:
+                pending.append(asyncio.create_task(
+                    self.rpc_request("getblock", [block_hash, 2])))
+                if len(pending) >= self.window:
+                    yield await pending.popleft()
+            while pending:
+                yield await pending.popleft()
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def scan(self, start: int, end: int,
+                   handle: Callable[[dict], Awaitable[int]]):
+        started = time.monotonic()
+        reported = started
+        scanned = 0
+        found = 0
+
+        async for block in self.blocks(start, end):
+            found += await handle(block)
+            scanned += 1
+
+            now = time.monotonic()
+            if now - reported >= self.report_interval:
+                reported = now
+                logger.info(
+                    f"Scanned block {block['height']}/{end}, "
+                    f"{scanned / (now - started):.1f} blocks per second, "
+                    f"{found} payments found")
+
+        if end > start:
+            elapsed = time.monotonic() - started
+            logger.info(f"Scanned blocks {start}-{end} in {elapsed:.1f} "
+                        f"seconds, {found} payments found")
@@ -0,0 +1,88 @@
+import os
+import asyncio
+from typing import Any, Awaitable, Callable
+
+from metrics import STAGE_DEPTH, STAGE_DROPS, STAGE_SPILLED
+
+
+class SpillFile:
+    def __init__(self, path: str):
+        self.path = path
+        self.count = 0
+        self.writer = None
+        self.reader = None
+        if os.path.exists(path):
+            with open(path, "rb") as spill:
+                while header := spill.read(4):
+                    spill.seek(int.from_bytes(header, "little"), 1)
+                    self.count += 1
+
+    def write(self, data: bytes):
+        if self.writer is None:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self.writer = open(self.path, "ab")
+        self.writer.write(len(data).to_bytes(4, "little") + data)
+        self.writer.flush()
+        self.count += 1
+
+    def read(self) -> bytes:
+        if self.reader is None:
+            self.reader = open(self.path, "rb")
+        size = int.from_bytes(self.reader.read(4), "little")
+        data = self.reader.read(size)
+        self.count -= 1
+
+        if not self.count:
+            self.reader.close()
+            if self.writer:
+                self.writer.close()
+            self.reader = self.writer = None
+            os.remove(self.path)
+        return data
+
+
+class Stage:
+    def __init__(self, name: str, handler: Callable[[Any], Awaitable[None]],
+                 workers: int, maxsize: int, policy: str,
+                 spill_dir: str = None):
+        self.name = name
+        self.handler = handler
+        self.workers = workers
+        self.policy = policy
+        self.queue = asyncio.Queue(maxsize)
+        self.spill = None
+        if policy == "spill" and spill_dir:
+            self.spill = SpillFile(os.path.join(spill_dir, f"{name}.spill"))
+        STAGE_DEPTH.labels(name).set_function(self.depth)
+
+    def depth(self) -> int:
+        return self.queue.qsize() + (self.spill.count if self.spill else 0)
+
+    async def put(self, item: Any, sheddable: bool = False):
+        spill = self.spill and isinstance(item, bytes)
+        if not self.queue.full() and not (spill and self.spill.count):
+            self.queue.put_nowait(item)
+        elif self.policy == "shed" and sheddable:
+            STAGE_DROPS.labels(self.name).inc()
+        elif spill:
+            STAGE_SPILLED.labels(self.name).inc()
+            self.spill.write(item)
+        else:
+            await self.queue.put(item)
+
+    def refill(self):
+        while self.spill.count and not self.queue.full():
+            self.queue.put_nowait(self.spill.read())
+
+    async def worker(self):
+        while True:
+            item = await self.queue.get()
+            if self.spill:
+                self.refill()
+            await self.handler(item)
+
+    def start(self, add_task: Callable):
+        if self.spill:
+            self.refill()
+        for _ in range(self.workers):
+            add_task(self.worker())
@@ -1,7 +1,9 @@
 import sys
+import time
 import logging
 import asyncio
 import signal
+from contextlib import asynccontextmanager
 from typing import Coroutine
 
 import asyncpg
@@ -10,6 +12,7 @@ import aiohttp
 from tenacity import retry, stop_after_attempt, wait_fixed
 
 from settings import settings
+from metrics import DB_POOL_WAIT, DAEMON_TASKS, serve_metrics
 
 
 logging.basicConfig(
@@ -32,6 +35,9 @@ class BaseDaemon:
         self.need_redis = need_redis
         self.need_rpc = need_rpc
         self.tasks = set()
+        self.db_pool: asyncpg.Pool = None
+        DAEMON_TASKS.labels(type(self).__name__).set_function(
+            lambda: len(self.tasks))
 
     def add_task(self, coro: Coroutine):
         task = asyncio.create_task(coro)
@@ -58,6 +64,7 @@ class BaseDaemon:
     async def astart(self):
         loop = asyncio.get_running_loop()
         loop.add_signal_handler(signal.SIGTERM, self.stop)
+        serve_metrics(settings.METRICS_PORT)
 
         coros = []
         if self.need_postgres:
@@ -69,6 +76,14 @@ class BaseDaemon:
 
         await asyncio.gather(*coros)
 
+        if self.need_postgres:
+            self.db_pool = await asyncpg.create_pool(
+                dsn=settings.DATABASE_URI,
+                min_size=settings.DB_POOL_MIN_SIZE,
+                max_size=settings.DB_POOL_MAX_SIZE,
+                statement_cache_size=settings.DB_STATEMENT_CACHE_SIZE,
+            )
+
         await self.handler()
 
     def stop(self):
@@ -82,11 +97,20 @@ class BaseDaemon:
                 task.cancel()
                 tasks.add(task)
 
-        await asyncio.gather(*tasks)
+        await asyncio.gather(*tasks, return_exceptions=True)
 
+        if self.db_pool:
+            await self.db_pool.close()
+
+    @asynccontextmanager
     async def get_db(self):
-        db_conn = await asyncpg.connect(dsn=settings.DATABASE_URI)
-        return db_conn
+        started = time.perf_counter()
+        async with self.db_pool.acquire(
+            timeout=settings.DB_POOL_TIMEOUT
+        ) as db_conn:
+            DB_POOL_WAIT.labels(type(self).__name__).observe(
+                time.perf_counter() - started)
+            yield db_conn
 
     @staticmethod
     @base_retry
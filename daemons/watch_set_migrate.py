@@ -0,0 +1,59 @@
+import time
+import asyncio
+import logging
+from datetime import datetime, timezone
+
+import redis.asyncio as redis
+
+import watch_set
+from settings import settings
+from daemons.utils import BaseDaemon
+from database.sql import Queries
+
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+
+class WatchSetMigrator(BaseDaemon):
+    def __init__(self):
+        super().__init__(need_postgres=True, need_redis=True)
+        self.cache_conn: redis.Redis = None
+
+    async def migrate_chunk(self, rows: list) -> int:
+        values = await self.cache_conn.mget(
+            [row["address"] for row in rows])
+        rows = [row for row, value in zip(rows, values) if value]
+        if rows:
+            await watch_set.add_many(self.cache_conn, rows)
+            await self.cache_conn.delete(*(row["address"] for row in rows))
+        return len(rows)
+
+    async def handler(self):
+        self.cache_conn = redis.Redis(host=settings.REDIS_HOST)
+        started = time.monotonic()
+        scanned = migrated = 0
+
+        try:
+            async with self.get_db() as db_conn:
+                async with db_conn.transaction(readonly=True):
+                    cursor = await db_conn.cursor(
+                        Queries.select_addresses_since,
+                        datetime.min.replace(tzinfo=timezone.utc))
+
+                    while rows := await cursor.fetch(
+                            settings.CACHE_WARM_CHUNK):
+                        migrated += await self.migrate_chunk(rows)
+                        scanned += len(rows)
+
+            logger.info(f"Migrated {migrated} of {scanned} addresses in "
+                        f"{time.monotonic() - started:.1f} seconds")
+        except asyncio.CancelledError:
+            pass
+        finally:
+            await self.cache_conn.close()
+
+
+if __name__ == "__main__":
+    daemon = WatchSetMigrator()
+    daemon.start()
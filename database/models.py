@@ -1,22 +1,52 @@
 from sqlalchemy import Column, Integer, String, DateTime, Boolean, Numeric, \
-                       func, ForeignKey, UniqueConstraint
+                       Text, ARRAY, func, ForeignKey, UniqueConstraint, \
+                       Index, Sequence, CheckConstraint
 
 from database.base import Base
 
 
+derivation_index_seq = Sequence("addresses_derivation_index_seq", start=0,
+                                minvalue=0, metadata=Base.metadata)
+
+
 class Address(Base):
     __tablename__ = "addresses"
 
     address = Column(String(70), primary_key=True)
-    order_id = Column(String(50), nullable=False, unique=True)
+    order_id = Column(String(50), unique=True)
     dt_created = Column(DateTime(timezone=True), server_default=func.now(),
                         nullable=False)
-    priv_key = Column(String(328), nullable=False)
+    priv_key = Column(String(328))
+    derivation_index = Column(Integer, unique=True)
+    expires_at = Column(DateTime(timezone=True), index=True)
+
+    CheckConstraint("priv_key is not null or derivation_index is not null",
+                    name="ck_addresses_key")
+    Index("ix_addresses_unclaimed", address,
+          postgresql_where=order_id.is_(None))
+    Index("ix_addresses_dt_created", dt_created, address,
+          postgresql_where=order_id.isnot(None))
 
     def __repr__(self):
         return f"<Address {self.address}>"
 
 
+class AddressArchive(Base):
+    __tablename__ = "addresses_archive"
+
+    address = Column(String(70), primary_key=True)
+    order_id = Column(String(50))
+    dt_created = Column(DateTime(timezone=True), nullable=False)
+    priv_key = Column(String(328))
+    derivation_index = Column(Integer)
+    expires_at = Column(DateTime(timezone=True))
+    dt_archived = Column(DateTime(timezone=True), server_default=func.now(),
+                         nullable=False)
+
+    def __repr__(self):
+        return f"<AddressArchive {self.address}>"
+
+
 class Payment(Base):
     __tablename__ = "payments"
 
@@ -32,8 +62,72 @@ class Payment(Base):
                      nullable=False, index=True)
     order_id = Column(String(50), nullable=False)
     forward_txid = Column(String(80))
+    forward_error = Column(String(200))
+    block_height = Column(Integer, index=True)
 
     UniqueConstraint(txid, address)
+    Index("ix_payments_unforwarded", id,
+          postgresql_where=forward_txid.is_(None))
+    Index("ix_payments_dt_created", dt_created, id)
 
     def __repr__(self):
         return f"<Payment {self.id}>"
+
+
+class PaymentArchive(Base):
+    __tablename__ = "payments_archive"
+
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    dt_created = Column(DateTime(timezone=True), nullable=False)
+    txid = Column(String(80), nullable=False)
+    vout = Column(Integer, nullable=False)
+    amount = Column(Numeric, nullable=False)
+    is_cb_active = Column(Boolean, nullable=False)
+    address = Column(String(70), nullable=False, index=True)
+    order_id = Column(String(50), nullable=False)
+    forward_txid = Column(String(80))
+    forward_error = Column(String(200))
+    block_height = Column(Integer)
+    dt_archived = Column(DateTime(timezone=True), server_default=func.now(),
+                         nullable=False)
+
+    def __repr__(self):
+        return f"<PaymentArchive {self.id}>"
+
+
+class Checkpoint(Base):
+    __tablename__ = "checkpoints"
+
+    name = Column(String(50), primary_key=True)
+    height = Column(Integer, nullable=False)
+    block_hash = Column(String(80), nullable=False)
+    dt_updated = Column(DateTime(timezone=True), server_default=func.now(),
+                        nullable=False)
+
+    def __repr__(self):
+        return f"<Checkpoint {self.name}>"
+
+
+class Callback(Base):
+    __tablename__ = "callbacks"
+
+    id = Column(Integer, primary_key=True)
+    dt_created = Column(DateTime(timezone=True), server_default=func.now(),
+                        nullable=False)
+    payment_id = Column(Integer, ForeignKey("payments.id"))
+    payment_ids = Column(ARRAY(Integer))
+    url = Column(String(2048), nullable=False)
+    payload = Column(Text, nullable=False)
+    status = Column(String(10), server_default="pending", nullable=False)
+    attempts = Column(Integer, server_default="0", nullable=False)
+    next_attempt_at = Column(DateTime(timezone=True),
+                             server_default=func.now(), nullable=False)
+    last_error = Column(Text)
+
+    Index("ix_callbacks_pending_payment_id", payment_id, unique=True,
+          postgresql_where=status == "pending")
+    Index("ix_callbacks_pending_next_attempt_at", next_attempt_at,
+          postgresql_where=status == "pending")
+
+    def __repr__(self):
+        return f"<Callback {self.id}>"
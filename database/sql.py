@@ -1,23 +1,178 @@
 class Queries:
     insert_address = """
-        insert into addresses (address, priv_key, order_id)
-        values ($1, $2, $3) returning *
+        insert into addresses (address, priv_key, order_id, expires_at)
+        values ($1, $2, $3, now() + make_interval(secs => $4::float8))
+        returning *
+    """
+
+    insert_hd_address = """
+        insert into addresses (address, derivation_index, order_id,
+                               expires_at)
+        values ($1, $2, $3, now() + make_interval(secs => $4::float8))
+        returning *
+    """
+
+    next_derivation_index = """
+        select nextval('addresses_derivation_index_seq')
+    """
+
+    next_derivation_indexes = """
+        select nextval('addresses_derivation_index_seq')
+        from generate_series(1, $1)
+    """
+
+    claim_address = """
+        update addresses set order_id = $1, dt_created = now(),
+            expires_at = now() + make_interval(secs => $2::float8)
+        where address = (
+            select address from addresses where order_id is null
+            limit 1 for update skip locked
+        )
+        returning *
+    """
+
+    claim_addresses = """
+        with free as (
+            select address from addresses where order_id is null
+            limit cardinality($1::text[]) for update skip locked
+        ), numbered as (
+            select address, row_number() over () as idx from free
+        ), wanted as (
+            select order_id, idx
+            from unnest($1::text[]) with ordinality as w(order_id, idx)
+        )
+        update addresses set order_id = wanted.order_id, dt_created = now(),
+            expires_at = now() + make_interval(secs => $2::float8)
+        from numbered join wanted using (idx)
+        where addresses.address = numbered.address
+        returning addresses.*
+    """
+
+    insert_addresses = """
+        insert into addresses (address, priv_key, derivation_index, order_id,
+                               expires_at)
+        select *, now() + make_interval(secs => $5::float8)
+        from unnest($1::text[], $2::text[], $3::int[], $4::text[])
+        returning *
+    """
+
+    find_order_ids = """
+        select order_id from addresses where order_id = any($1::text[])
+    """
+
+    count_unclaimed_addresses = """
+        select count(*) from addresses where order_id is null
     """
 
     select_address = """
-        select * from addresses where address = $1
+        select * from addresses where address = $1 and order_id is not null
     """
 
     find_address = """
         select * from addresses where order_id = $1
     """
 
+    list_addresses = """
+        select dt_created, address, order_id from addresses
+        where order_id is not null
+            and (dt_created, address) > ($1, $2)
+            and dt_created < $3
+            and ($4::text is null or $4 = case
+                when exists (
+                    select 1 from payments
+                    where payments.address = addresses.address
+                ) then 'paid' else 'unpaid' end)
+        order by dt_created, address limit $5
+    """
+
+    list_payments = """
+        select * from payments
+        where (dt_created, id) > ($1, $2)
+            and dt_created < $3
+            and ($4::text is null or $4 = case
+                when forward_txid is not null then 'forwarded'
+                when block_height is not null then 'confirmed'
+                else 'pending' end)
+        order by dt_created, id limit $5
+    """
+
     select_address_payments = """
         select * from payments where address = $1 order by id
     """
 
-    select_address_order_id = """
-        select address, order_id from addresses
+    select_addresses_since = """
+        select address, order_id, dt_created, expires_at from addresses
+        where order_id is not null and dt_created > $1
+            and (expires_at is null or expires_at > now())
+        order by dt_created, address
+    """
+
+    count_addresses_since = """
+        select count(*) from addresses
+        where order_id is not null and dt_created > $1
+            and (expires_at is null or expires_at > now())
+    """
+
+    select_watched_addresses = """
+        select address from addresses
+        where order_id is not null
+            and (expires_at is null or expires_at > now())
+    """
+
+    count_watched_addresses = """
+        select count(*) from addresses
+        where order_id is not null
+            and (expires_at is null or expires_at > now())
+    """
+
+    archive_addresses = """
+        with expired as (
+            select address from addresses
+            where expires_at < now()
+                and not exists (
+                    select 1 from payments
+                    where payments.address = addresses.address
+                        and ((forward_txid is null and forward_error is null)
+                            or is_cb_active)
+                )
+                and not exists (
+                    select 1 from callbacks
+                    join payments on payments.id = callbacks.payment_id
+                        or payments.id = any(callbacks.payment_ids)
+                    where payments.address = addresses.address
+                        and callbacks.status = 'pending'
+                )
+            order by expires_at limit $1
+            for update skip locked
+        ), detached as (
+            update callbacks set payment_id = null
+            from payments
+            where payments.id = callbacks.payment_id
+                and payments.address in (select address from expired)
+        ), moved_payments as (
+            delete from payments
+            where address in (select address from expired)
+            returning *
+        ), archived_payments as (
+            insert into payments_archive (id, dt_created, txid, vout, amount,
+                                          is_cb_active, address, order_id,
+                                          forward_txid, forward_error,
+                                          block_height)
+            select id, dt_created, txid, vout, amount, is_cb_active, address,
+                order_id, forward_txid, forward_error, block_height
+            from moved_payments
+        ), moved as (
+            delete from addresses
+            where address in (select address from expired)
+            returning *
+        )
+        insert into addresses_archive (address, order_id, dt_created,
+                                       priv_key, derivation_index,
+                                       expires_at)
+        select address, order_id, dt_created, priv_key, derivation_index,
+            expires_at
+        from moved
+        returning address, order_id, expires_at
     """
 
     insert_payment = """
@@ -25,18 +180,127 @@ class Queries:
         values ($1, $2, $3, $4, $5) returning *
     """
 
-    select_priv_key = """
-        select priv_key from addresses where address = $1
+    select_priv_keys = """
+        select address, priv_key, derivation_index from addresses
+        where address = any($1::text[])
+    """
+
+    has_derived_addresses = """
+        select exists(
+            select 1 from addresses where derivation_index is not null
+        )
+    """
+
+    select_unforwarded_payments = """
+        select * from payments
+        where forward_txid is null and forward_error is null
+            and ($2::int is null or block_height <= $2)
+            and amount > $3
+        order by id limit $1
+    """
+
+    update_forward_error = """
+        update payments set forward_error = $1 where id = any($2::int[])
     """
 
     update_forward_txid = """
-        update payments set forward_txid = $1 where id = $2
+        update payments set forward_txid = $1 where id = any($2::int[])
     """
 
     update_is_cb_active = """
         update payments set is_cb_active = False where id = $1
     """
 
+    update_is_cb_active_many = """
+        update payments set is_cb_active = False where id = any($1::int[])
+    """
+
     select_active_payments = """
         select * from payments where is_cb_active
     """
+
+    select_unconfirmed_payments = """
+        select * from payments where is_cb_active and block_height is null
+    """
+
+    insert_block_payments = """
+        insert into payments (txid, vout, amount, address, order_id,
+                              block_height)
+        select outputs.txid, outputs.vout, outputs.amount, addresses.address,
+            addresses.order_id, $5
+        from unnest($1::text[], $2::int[], $3::numeric[], $4::text[])
+            as outputs(txid, vout, amount, address)
+        join addresses on addresses.address = outputs.address
+        where addresses.order_id is not null
+            and (addresses.expires_at is null
+                 or addresses.expires_at > to_timestamp($6::float8))
+        on conflict (txid, address) do nothing
+        returning *
+    """
+
+    select_checkpoint = """
+        select height, block_hash from checkpoints where name = $1
+    """
+
+    update_checkpoint = """
+        insert into checkpoints (name, height, block_hash) values ($1, $2, $3)
+        on conflict (name) do update set height = excluded.height,
+            block_hash = excluded.block_hash, dt_updated = now()
+    """
+
+    update_block_height = """
+        update payments set block_height = $1 where txid = any($2::text[])
+    """
+
+    update_payment_block_height = """
+        update payments set block_height = $1 where id = $2
+    """
+
+    reset_block_height = """
+        update payments set block_height = null where block_height > $1
+    """
+
+    insert_callback = """
+        insert into callbacks (payment_id, url, payload) values ($1, $2, $3)
+        on conflict (payment_id) where status = 'pending'
+        do update set payload = excluded.payload
+    """
+
+    insert_batch_callback = """
+        insert into callbacks (payment_ids, url, payload) values ($1, $2, $3)
+    """
+
+    delete_pending_batch_callbacks = """
+        delete from callbacks
+        where payment_ids is not null and url = $1 and status = 'pending'
+        returning id, payment_ids, payload
+    """
+
+    claim_callbacks = """
+        update callbacks
+        set next_attempt_at = now() + make_interval(secs => $2)
+        where id in (
+            select id from callbacks
+            where status = 'pending' and next_attempt_at <= now()
+            order by next_attempt_at
+            limit $1 for update skip locked
+        )
+        returning *
+    """
+
+    delete_sent_callback = """
+        delete from callbacks where id = $1 and payload = $2
+    """
+
+    release_callback = """
+        update callbacks set next_attempt_at = now() where id = $1
+    """
+
+    retry_callback = """
+        update callbacks
+        set attempts = attempts + 1, last_error = $2,
+            next_attempt_at = now() + make_interval(secs => $3),
+            status = case when attempts + 1 >= $4 then 'dead' else status end
+        where id = $1
+        returning status
+    """
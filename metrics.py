@@ -0,0 +1,124 @@
+import os
+
+from prometheus_client import Counter, Histogram, Gauge, CollectorRegistry, \
+                              make_asgi_app, start_http_server, multiprocess
+
+
+DB_POOL_WAIT = Histogram(
+    "db_pool_wait_seconds",
+    "Time spent waiting for a database pool connection",
+    ["service"]
+)
+
+CALLBACK_LATENCY = Histogram(
+    "callback_latency_seconds",
+    "Callback request latency",
+    ["target"]
+)
+CALLBACK_REQUESTS = Counter(
+    "callback_requests_total",
+    "Callback requests by response status",
+    ["target", "status"]
+)
+CALLBACK_DEAD = Counter(
+    "callback_dead_letters_total",
+    "Callbacks moved to the dead-letter state",
+    ["target"]
+)
+
+FEE_CACHE_REQUESTS = Counter(
+    "fee_cache_requests_total",
+    "Fee rate cache lookups by result",
+    ["result"]
+)
+
+ADDRESS_CACHE_REQUESTS = Counter(
+    "address_cache_requests_total",
+    "Address lookup cache requests by tier and result",
+    ["tier", "result"]
+)
+
+RATE_TICKS = Counter(
+    "rate_ticks_total",
+    "Exchange rate ticks received by source and transport",
+    ["source", "transport"]
+)
+
+HTTP_REQUEST_LATENCY = Histogram(
+    "http_request_latency_seconds",
+    "API request latency by route",
+    ["method", "route", "status"]
+)
+
+RPC_LATENCY = Histogram(
+    "rpc_latency_seconds",
+    "Bitcoin node RPC latency by method",
+    ["method"]
+)
+
+RPC_ERRORS = Counter(
+    "rpc_errors_total",
+    "Failed bitcoin node RPC calls by method",
+    ["method"]
+)
+
+ZMQ_MESSAGES = Counter(
+    "zmq_messages_total",
+    "ZMQ notifications received by topic",
+    ["topic"]
+)
+
+RAW_TX_ERRORS = Counter(
+    "raw_tx_decode_errors_total",
+    "Raw transactions skipped because they could not be decoded"
+)
+
+DAEMON_TASKS = Gauge(
+    "daemon_tasks",
+    "Number of running daemon tasks",
+    ["service"]
+)
+
+BLOCK_PROCESSING = Histogram(
+    "block_processing_seconds",
+    "Time spent processing a new block",
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+)
+
+
+CHECKPOINT_HEIGHT = Gauge(
+    "checkpoint_height",
+    "Last block height scanned for payments by the network daemon"
+)
+
+STAGE_DEPTH = Gauge(
+    "stage_queue_depth",
+    "Items waiting in a network daemon stage queue",
+    ["stage"]
+)
+
+STAGE_DROPS = Counter(
+    "stage_dropped_total",
+    "Items dropped because a stage queue was full",
+    ["stage"]
+)
+
+STAGE_SPILLED = Counter(
+    "stage_spilled_total",
+    "Items written to disk because a stage queue was full",
+    ["stage"]
+)
+
+
+def metrics_app():
+    if "PROMETHEUS_MULTIPROC_DIR" not in os.environ:
+        return make_asgi_app()
+
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return make_asgi_app(registry)
+
+
+def serve_metrics(port: int | None):
+    if port:
+        start_http_server(port)
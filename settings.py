@@ -1,5 +1,7 @@
 from base64 import urlsafe_b64encode
+from decimal import Decimal
 from hashlib import md5
+from typing import Literal
 
 from pydantic import BaseSettings, AnyUrl, AnyHttpUrl, PostgresDsn, Field
 from cryptography.fernet import Fernet
@@ -15,16 +17,90 @@ init_settings = InitialSettings()
 class Settings(InitialSettings):
     TESTNET: bool
     DATABASE_URI: PostgresDsn
+    METRICS_PORT: int | None = 9100
+    DB_POOL_MIN_SIZE: int = 2
+    DB_POOL_MAX_SIZE: int = 10
+    DB_POOL_TIMEOUT: float = 10
+    DB_STATEMENT_CACHE_SIZE: int = 100
     REDIS_HOST: str
     CALLBACK_URL: AnyHttpUrl
+    CALLBACK_BATCH: bool = False
+    CALLBACK_CONCURRENCY: int = 50
+    CALLBACK_CONCURRENCY_PER_HOST: int = 10
+    CALLBACK_TIMEOUT: float = 15
+    CALLBACK_LEASE: float = 60
+    CALLBACK_MAX_ATTEMPTS: int = 12
+    CALLBACK_BACKOFF_BASE: float = 2
+    CALLBACK_BACKOFF_MAX: float = 3600
+    CALLBACK_POLL_INTERVAL: float = 1
     CIPHER: Fernet = Fernet(urlsafe_b64encode(
         md5(init_settings.SECRET_KEY.encode()).hexdigest()[:32].encode()
     ))
     RPC_PROVIDER: AnyHttpUrl
     RPC_USER: str
     RPC_PASSWORD: str
+    RPC_BATCH_SIZE: int = 500
+    RPC_BATCH_CONCURRENCY: int = 4
+    REORG_DEPTH: int = 100
     ZMQ_SOCKET: AnyUrl
     ADDRESS: str
+    ZMQ_RCVHWM: int = 100000
+    STAGE_QUEUE_SIZE: int = 10000
+    STAGE_WORKERS: dict[str, int] = {
+        "decode": 1, "match": 16, "persist": 8
+    }
+    STAGE_FULL_POLICY: Literal["block", "shed", "spill"] = "block"
+    STAGE_SPILL_DIR: str = "/tmp/cps-spill"
+    RESYNC_WINDOW: int = 10
+    RESYNC_REPORT_INTERVAL: int = 5
+    NETWORK_WORKERS: int = 0
+    NETWORK_WORKER_ENDPOINT: str = "ipc:///tmp/cps-rawtx.ipc"
+    LEADER_LOCK_KEY: str = "network:leader"
+    LEADER_LOCK_TTL: float = 30
+    FEE_CONF_TARGET: int = 5
+    FEE_CACHE_MAX_AGE: float = 1800
+    FEE_FALLBACK_RATE: float = 0.0001
+    SWEEP_INTERVAL: float = 600
+    SWEEP_ON_BLOCK: bool = True
+    SWEEP_MAX_INPUTS: int = 200
+    SWEEP_MIN_CONFIRMATIONS: int = 1
+    HD_XPUB: str = None
+    HD_XPRV: str = None
+    PAGE_LIMIT_MAX: int = 1000
+    EXPORT_PREFETCH: int = 1000
+    RATE_SYMBOLS: list[str] = ["BTCUSD"]
+    RATE_SOURCES: list[str] = ["binance", "coinbase", "kraken"]
+    RATE_AGGREGATION: Literal["median", "vwap"] = "median"
+    RATE_THRESHOLD: Decimal = Decimal("0.0005")
+    RATE_HEARTBEAT: float = 15
+    RATE_SOURCE_MAX_AGE: float = 60
+    RATE_STREAM_TIMEOUT: float = 60
+    RATE_RECONNECT_DELAY: float = 30
+    RATE_REST_INTERVAL: float = 10
+    RATE_CHANNEL: str = "exchange_rates"
+    RATE_MAX_AGE: float = 60
+    CACHE_WARM_CHUNK: int = 5000
+    CACHE_WARM_OVERLAP: float = 300
+    CACHE_WARM_REPORT_INTERVAL: float = 5
+    ADDRESS_LIFETIME: float | None = 14 * 24 * 3600
+    ARCHIVE_INTERVAL: float = 3600
+    ARCHIVE_BATCH: int = 1000
+    ADDRESS_CACHE_SIZE: int = 10000
+    ADDRESS_CACHE_TTL: float = 60
+    ADDRESS_CACHE_NEGATIVE_TTL: float = 5
+    ADDRESS_CACHE_REDIS_TTL: int = 7 * 24 * 3600
+    ADDRESS_CACHE_CHANNEL: str = "address_cache"
+    ADDRESS_BATCH_LIMIT: int = 10000
+    ADDRESS_POOL_LOW_WATER: int = 1000
+    ADDRESS_POOL_HIGH_WATER: int = 5000
+    ADDRESS_POOL_CHUNK: int = 500
+    ADDRESS_POOL_WORKERS: int = None
+    ADDRESS_POOL_INTERVAL: float = 5
+    WATCH_BUCKETS: int = 16384
+    WATCH_CHANNEL: str = "watched_addresses"
+    WATCH_FILTER_CAPACITY: int = 100000
+    WATCH_FILTER_ERROR_RATE: float = 0.001
+    WATCH_FILTER_REBUILD_INTERVAL: float | None = 3600
 
 
 settings = Settings()
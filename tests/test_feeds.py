@@ -0,0 +1,134 @@
+import asyncio
+from decimal import Decimal
+
+import aiohttp
+
+from settings import settings
+from daemons.feeds import BinanceFeed, CoinbaseFeed, KrakenFeed
+from daemons.exchange import ExchangeRateDaemon
+from benchmarks.stubs import FakeExchange, serve_app
+
+
+PRICES = {
+    "binance": ("25000.10", "10"),
+    "coinbase": ("25100.20", "20"),
+    "kraken": ("25300.30", "5")
+}
+
+
+def make_feeds(base_url: str) -> list:
+    return [
+        BinanceFeed(["BTCUSD"], f"{base_url}/binance/ws",
+                    f"{base_url}/binance/rest"),
+        CoinbaseFeed(["BTCUSD"], f"{base_url}/coinbase/ws",
+                     f"{base_url}/coinbase/rest"),
+        KrakenFeed(["BTCUSD"], f"{base_url}/kraken/ws",
+                   f"{base_url}/kraken/rest")
+    ]
+
+
+async def start_exchange(exchange: FakeExchange):
+    runner = await serve_app(exchange.app(), 0)
+    port = runner.addresses[0][1]
+    return runner, f"http://127.0.0.1:{port}"
+
+
+def fast_reconnect(monkeypatch):
+    monkeypatch.setattr(settings, "RATE_RECONNECT_DELAY", 0.3)
+    monkeypatch.setattr(settings, "RATE_REST_INTERVAL", 0.05)
+    monkeypatch.setattr(settings, "RATE_HEARTBEAT", 0.1)
+
+
+def test_parse_messages():
+    binance, coinbase, kraken = make_feeds("http://127.0.0.1")
+
+    [tick] = binance.parse({"data": {"s": "BTCUSD", "c": "1.5", "v": "2"}})
+    assert (tick.source, tick.symbol, tick.price, tick.volume) == \
+        ("binance", "BTCUSD", Decimal("1.5"), Decimal("2"))
+
+    [tick] = coinbase.parse({"type": "ticker", "product_id": "BTC-USD",
+                             "price": "3", "volume_24h": "4"})
+    assert (tick.source, tick.symbol, tick.price) == \
+        ("coinbase", "BTCUSD", Decimal("3"))
+
+    [tick] = kraken.parse({"channel": "ticker", "data": [
+        {"symbol": "BTC/USD", "last": 5, "volume": 6}]})
+    assert (tick.source, tick.symbol, tick.volume) == \
+        ("kraken", "BTCUSD", Decimal("6"))
+
+    assert binance.parse({"data": {"s": "ETHUSD", "c": "1", "v": "1"}}) == []
+    assert coinbase.parse({"type": "heartbeat"}) == []
+    assert kraken.parse({"channel": "status", "data": []}) == []
+
+
+def test_rest_fallback_on_disconnect(monkeypatch):
+    fast_reconnect(monkeypatch)
+
+    async def run():
+        exchange = FakeExchange()
+        exchange.prices.update(PRICES)
+        exchange.down.add("coinbase")
+        runner, base_url = await start_exchange(exchange)
+        ticks = []
+
+        async def on_tick(tick):
+            ticks.append(tick)
+
+        feed = make_feeds(base_url)[1]
+        async with aiohttp.ClientSession() as session:
+            task = asyncio.create_task(feed.run(session, on_tick))
+            await asyncio.sleep(0.2)
+            polled = len(ticks)
+
+            exchange.down.discard("coinbase")
+            await asyncio.sleep(0.6)
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+        await runner.cleanup()
+        return exchange, polled, ticks
+
+    exchange, polled, ticks = asyncio.run(run())
+    assert polled > 0
+    assert exchange.polls["coinbase"] >= polled
+    assert exchange.connections["coinbase"] >= 2
+    assert len(ticks) > exchange.polls["coinbase"]
+    assert {tick.price for tick in ticks} == {Decimal("25100.20")}
+
+
+class RecordingDaemon(ExchangeRateDaemon):
+    def __init__(self):
+        super().__init__()
+        self.publications: list[tuple[str, str]] = []
+
+    async def publish_rate(self, symbol: str, price: str):
+        self.publications.append((symbol, price))
+
+
+def test_aggregated_rate_published(monkeypatch):
+    fast_reconnect(monkeypatch)
+    monkeypatch.setattr(settings, "RATE_SYMBOLS", ["BTCUSD"])
+
+    async def run():
+        exchange = FakeExchange()
+        exchange.prices.update(PRICES)
+        runner, base_url = await start_exchange(exchange)
+
+        daemon = RecordingDaemon()
+        daemon.aggregator.method = "median"
+        daemon.feeds = make_feeds(base_url)
+        task = asyncio.create_task(daemon.handler())
+        await asyncio.sleep(0.5)
+
+        exchange.down.add("kraken")
+        exchange.prices["binance"] = ("26000.10", "10")
+        await asyncio.sleep(0.5)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        await runner.cleanup()
+        return daemon
+
+    daemon = asyncio.run(run())
+    prices = [price for _, price in daemon.publications]
+    assert "25100.20" in prices
+    assert prices[-1] == "25300.30"
+    assert {symbol for symbol, _ in daemon.publications} == {"BTCUSD"}
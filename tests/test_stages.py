@@ -0,0 +1,135 @@
+import os
+import asyncio
+
+import pytest
+from prometheus_client import REGISTRY
+
+from daemons.stages import SpillFile, Stage
+
+
+def sample(name: str, stage: str) -> float:
+    return REGISTRY.get_sample_value(name, {"stage": stage}) or 0
+
+
+def test_block_waits_for_worker():
+    async def run():
+        handled = []
+        release = asyncio.Event()
+
+        async def handler(item):
+            await release.wait()
+            handled.append(item)
+
+        tasks = []
+        stage = Stage("test-block", handler, 1, 1, "block")
+        stage.start(lambda coro: tasks.append(asyncio.create_task(coro)))
+
+        await stage.put(1)
+        await asyncio.sleep(0)
+        await stage.put(2)
+        blocked = asyncio.create_task(stage.put(3, sheddable=True))
+        await asyncio.sleep(0.05)
+        assert not blocked.done()
+
+        release.set()
+        await asyncio.wait_for(blocked, 1)
+        while len(handled) < 3:
+            await asyncio.sleep(0.01)
+        assert handled == [1, 2, 3]
+        for task in tasks:
+            task.cancel()
+
+    asyncio.run(run())
+
+
+def test_shed_drops_only_sheddable():
+    async def run():
+        async def handler(item):
+            pass
+
+        stage = Stage("test-shed", handler, 1, 1, "shed")
+        dropped = sample("stage_dropped_total", "test-shed")
+
+        await stage.put(b"kept")
+        await stage.put(b"dropped", sheddable=True)
+        await stage.put(b"dropped", sheddable=True)
+        assert sample("stage_dropped_total", "test-shed") == dropped + 2
+        assert stage.depth() == 1
+
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(stage.put(b"waits"), 0.05)
+
+    asyncio.run(run())
+
+
+def test_spill_replays_in_order(tmp_path):
+    async def run():
+        handled = []
+
+        async def handler(item):
+            handled.append(item)
+
+        stage = Stage("test-spill", handler, 1, 1, "spill", str(tmp_path))
+        path = tmp_path / "test-spill.spill"
+        spilled = sample("stage_spilled_total", "test-spill")
+
+        for item in (b"1", b"22", b"333"):
+            await stage.put(item, sheddable=True)
+        assert sample("stage_spilled_total", "test-spill") == spilled + 2
+        assert stage.depth() == 3
+        assert path.exists()
+
+        tasks = []
+        stage.start(lambda coro: tasks.append(asyncio.create_task(coro)))
+        while len(handled) < 3:
+            await asyncio.sleep(0.01)
+        assert handled == [b"1", b"22", b"333"]
+        assert stage.depth() == 0
+        assert not path.exists()
+        for task in tasks:
+            task.cancel()
+
+    asyncio.run(run())
+
+
+def test_spill_count_recovered_after_restart(tmp_path):
+    path = str(tmp_path / "decode.spill")
+    spill = SpillFile(path)
+    spill.write(b"first")
+    spill.write(b"")
+    spill.write(b"third")
+    assert spill.read() == b"first"
+
+    reopened = SpillFile(path)
+    assert reopened.count == 3
+    assert [reopened.read() for _ in range(3)] == [b"first", b"", b"third"]
+    assert not os.path.exists(path)
+
+
+def test_spill_keeps_order_with_new_arrivals(tmp_path):
+    async def run():
+        handled = []
+        items = [str(n).encode() for n in range(12)]
+
+        async def handler(item):
+            handled.append(item)
+            await asyncio.sleep(0.01)
+
+        tasks = []
+        stage = Stage("test-arrivals", handler, 2, 2, "spill", str(tmp_path))
+        for item in items[:6]:
+            await stage.put(item, sheddable=True)
+        assert stage.spill.count == 4
+
+        stage.start(lambda coro: tasks.append(asyncio.create_task(coro)))
+        for item in items[6:]:
+            await asyncio.sleep(0.005)
+            await stage.put(item, sheddable=True)
+        while len(handled) < len(items):
+            await asyncio.sleep(0.01)
+        assert handled == items
+        assert stage.depth() == 0
+        for task in tasks:
+            task.cancel()
+
+    asyncio.run(run())
@@ -0,0 +1,138 @@
+from decimal import Decimal
+
+import pytest
+
+from btc.encoding import sha256d
+from btc.transaction import decode_transaction, read_varint, write_varint
+
+
+GENESIS_TX = bytes.fromhex(
+    "01000000010000000000000000000000000000000000000000000000000000000000"
+    "000000ffffffff4d04ffff001d0104455468652054696d65732030332f4a616e2f32"
+    "303039204368616e63656c6c6f72206f6e206272696e6b206f66207365636f6e6420"
+    "6261696c6f757420666f722062616e6b73ffffffff0100f2052a0100000043410467"
+    "8afdb0fe5548271967f1a67130b7105cd6a828e03909a67962e0ea1f61deb649f6bc"
+    "3f4cef38c4f35504e51ec112de5c384df7ba0b8d578a4c702b6bf11d5fac00000000"
+)
+
+OUTPUT_SCRIPTS = [
+    ("76a91462e907b15cbf27d5425399ebf6f0fb50ebb88f1888ac",
+     "1A1zP1eP5QGefi2DMPTfTL5SLmv7DivfNa",
+     "mpXwg4jMtRhuSpVq4xS3HFHmCmWp9NyGKt"),
+    ("a914b472a266d0bd89c13706a4132ccfb16f7c3b9fcb87",
+     "3J98t1WpEZ73CNmQviecrnyiWrnqRhWNLy",
+     "2N9hLwkSqr1cPQAPxbrGVUjxyjD11G2e1he"),
+    ("0014751e76e8199196d454941c45d1b3a323f1433bd6",
+     "bc1qw508d6qejxtdg4y5r3zarvary0c5xw7kv8f3t4",
+     "tb1qw508d6qejxtdg4y5r3zarvary0c5xw7kxpjzsx"),
+    ("00201863143c14c5166804bd19203356da136c985678cd4d27a1b8c632960490"
+     "3262",
+     "bc1qrp33g0q5c5txsp9arysrx4k6zdkfs4nce4xj0gdcccefvpysxf3qccfmv3",
+     "tb1qrp33g0q5c5txsp9arysrx4k6zdkfs4nce4xj0gdcccefvpysxf3q0sl5k7"),
+    ("512079be667ef9dcbbac55a06295ce870b07029bfcdb2dce28d959f2815b16f8"
+     "1798",
+     "bc1p0xlxvlhemja6c4dqv22uapctqupfhlxm9h8z3k2e72q4k9hcz7vqzk5jj0",
+     "tb1p0xlxvlhemja6c4dqv22uapctqupfhlxm9h8z3k2e72q4k9hcz7vq47zagq"),
+    ("6a0401020304", None, None)
+]
+
+
+def serialize(inputs: list[bytes], outputs: list[tuple[int, bytes]],
+              witness: list[list[bytes]] = None) -> bytes:
+    body = write_varint(len(inputs))
+    for idx, script_sig in enumerate(inputs):
+        body += bytes([idx]) * 32 + idx.to_bytes(4, "little")
+        body += write_varint(len(script_sig)) + script_sig + b"\xff" * 4
+    body += write_varint(len(outputs))
+    for value, script in outputs:
+        body += value.to_bytes(8, "little")
+        body += write_varint(len(script)) + script
+
+    version = (2).to_bytes(4, "little")
+    locktime = (0).to_bytes(4, "little")
+    if witness is None:
+        return version + body + locktime
+
+    for items in witness:
+        body += write_varint(len(items))
+        for item in items:
+            body += write_varint(len(item)) + item
+    return version + b"\x00\x01" + body + locktime
+
+
+def test_genesis_coinbase():
+    tx = decode_transaction(GENESIS_TX)
+    assert tx.txid == ("4a5e1e4baab89f3a32518a88c31bc87f"
+                       "618f76673e2cc77ab2127b7afdeda33b")
+    [vout] = tx.vout
+    assert vout.n == 0
+    assert vout.value == Decimal("50")
+    assert vout.address is None
+
+
+def test_output_addresses():
+    outputs = [(1000 + n, bytes.fromhex(script))
+               for n, (script, _, _) in enumerate(OUTPUT_SCRIPTS)]
+    raw = serialize([b"\x51"], outputs)
+
+    mainnet = decode_transaction(raw)
+    testnet = decode_transaction(raw, testnet=True)
+    assert [vout.address for vout in mainnet.vout] == \
+        [address for _, address, _ in OUTPUT_SCRIPTS]
+    assert [vout.address for vout in testnet.vout] == \
+        [address for _, _, address in OUTPUT_SCRIPTS]
+    assert [vout.value for vout in mainnet.vout] == \
+        [Decimal(value).scaleb(-8) for value, _ in outputs]
+
+
+def test_segwit_txid_excludes_witness():
+    inputs = [b"", b"\x51"]
+    outputs = [(50000, bytes.fromhex(OUTPUT_SCRIPTS[2][0]))]
+    legacy = serialize(inputs, outputs)
+    segwit = serialize(inputs, outputs, [[b"\x30" * 71, b"\x02" * 33], []])
+    other = serialize(inputs, outputs, [[b"\x31" * 72], [b""]])
+
+    txid = sha256d(legacy)[::-1].hex()
+    assert decode_transaction(legacy).txid == txid
+    assert decode_transaction(segwit).txid == txid
+    assert decode_transaction(other).txid == txid
+    assert decode_transaction(segwit).vout == decode_transaction(legacy).vout
+
+
+@pytest.mark.parametrize("number, encoded", [
+    (0, "00"),
+    (0xfc, "fc"),
+    (0xfd, "fdfd00"),
+    (0xffff, "fdffff"),
+    (0x10000, "fe00000100"),
+    (0xffffffff, "feffffffff"),
+    (0x100000000, "ff0000000001000000")
+])
+def test_varint(number, encoded):
+    assert write_varint(number).hex() == encoded
+    data = b"\xaa" + bytes.fromhex(encoded) + b"\xbb"
+    assert read_varint(data, 1) == (number, len(data) - 1)
+
+
+def test_many_outputs():
+    script = bytes.fromhex(OUTPUT_SCRIPTS[2][0])
+    raw = serialize([b"\x51"], [(n, script) for n in range(300)],
+                    [[b"\x01"]])
+    tx = decode_transaction(raw)
+    assert len(tx.vout) == 300
+    assert tx.vout[-1].n == 299
+    assert tx.vout[-1].value == Decimal(299).scaleb(-8)
+
+
+@pytest.mark.parametrize("raw", [
+    b"",
+    GENESIS_TX[:40],
+    GENESIS_TX[:-1],
+    GENESIS_TX + b"\x00",
+    serialize([b""], [(1, b"\x51")], [[b"\x01" * 10]])[:-8],
+    serialize([b""], [(1, b"\x51")], [[b"\x01" * 10]]) + b"\x00"
+], ids=["empty", "truncated", "short_locktime", "trailing_byte",
+        "truncated_witness", "witness_trailing_byte"])
+def test_malformed_raises_value_error(raw):
+    with pytest.raises(ValueError):
+        decode_transaction(raw)
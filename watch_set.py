@@ -0,0 +1,118 @@
+import math
+import time
+from datetime import datetime
+from hashlib import blake2b
+
+from redis.asyncio import Redis
+
+from settings import settings
+
+
+PREFIX = "watch:"
+DAY = 86400
+FIRST_HGET = """
+for _, key in ipairs(KEYS) do
+    local value = redis.call("HGET", key, ARGV[1])
+    if value then
+        return value
+    end
+end
+return false
+"""
+
+
+def window_days() -> int:
+    if not settings.ADDRESS_LIFETIME:
+        return 0
+    return math.ceil(settings.ADDRESS_LIFETIME / DAY) + 1
+
+
+def _number(address: str) -> int:
+    digest = blake2b(address.encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "big")
+
+
+def _day_bucket(number: int, day: int) -> str:
+    buckets = max(1, settings.WATCH_BUCKETS // max(1, window_days()))
+    return f"{PREFIX}{day}:{number % buckets}"
+
+
+def bucket(address: str, expires_at: datetime | None = None) -> str:
+    if expires_at is None:
+        return f"{PREFIX}{_number(address) % settings.WATCH_BUCKETS}"
+    return _day_bucket(_number(address),
+                       int(expires_at.timestamp() // DAY))
+
+
+def layout() -> str:
+    return f"{settings.WATCH_BUCKETS}:{window_days()}"
+
+
+def _home(address: str, key: str) -> str:
+    parts = key[len(PREFIX):].split(":")
+    if len(parts) == 1:
+        return bucket(address)
+    return _day_bucket(_number(address), int(parts[0]))
+
+
+def candidate_buckets(address: str) -> list[str]:
+    number = _number(address)
+    today = int(time.time() // DAY)
+    return [f"{PREFIX}{number % settings.WATCH_BUCKETS}"] + [
+        _day_bucket(number, day)
+        for day in range(today, today + window_days())
+    ]
+
+
+async def get(redis: Redis, address: str) -> bytes | None:
+    keys = candidate_buckets(address)
+    return await redis.eval(FIRST_HGET, len(keys), *keys, address)
+
+
+async def add(redis: Redis, address: str, order_id: str,
+              expires_at: datetime | None = None):
+    await add_many(redis, [{
+        "address": address,
+        "order_id": order_id,
+        "expires_at": expires_at
+    }])
+
+
+async def add_many(redis: Redis, rows: list):
+    buckets: dict[str, dict[str, str]] = {}
+    expiry: dict[str, int] = {}
+    for row in rows:
+        key = bucket(row["address"], row["expires_at"])
+        buckets.setdefault(key, {})[row["address"]] = row["order_id"]
+        if row["expires_at"] is not None:
+            day = int(row["expires_at"].timestamp() // DAY)
+            expiry[key] = (day + 1) * DAY
+
+    pipe = redis.pipeline(transaction=False)
+    for key, mapping in buckets.items():
+        pipe.hset(key, mapping=mapping)
+        if key in expiry:
+            pipe.expireat(key, expiry[key])
+    await pipe.execute()
+
+
+async def remove_many(redis: Redis, rows: list):
+    pipe = redis.pipeline(transaction=False)
+    for row in rows:
+        pipe.hdel(bucket(row["address"]), row["address"])
+        if row["expires_at"] is not None:
+            pipe.hdel(bucket(row["address"], row["expires_at"]),
+                      row["address"])
+    await pipe.execute()
+
+
+async def prune(redis: Redis) -> int:
+    removed = 0
+    async for key in redis.scan_iter(f"{PREFIX}*"):
+        stale = [
+            address async for address, _ in redis.hscan_iter(key)
+            if _home(address.decode(), key.decode()) != key.decode()
+        ]
+        if stale:
+            removed += await redis.hdel(key, *stale)
+    return removed